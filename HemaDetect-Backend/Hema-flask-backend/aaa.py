@@ -1,150 +1,165 @@
-﻿from flask import Flask, request, jsonify
+﻿from flask import Flask, Response, request, jsonify, url_for
 from flask_cors import CORS  # Add this import
+import os
 import numpy as np
-import tensorflow as tf
-import cv2
 from PIL import Image
-import io
+import tensorflow as tf
 import base64
-from sklearn.cluster import KMeans
-from scipy import ndimage as ndi
-from skimage import morphology
+import json
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from batching import BatchingEngine
+from gradcam import grad_cam_plus_intensity
+from image_encoding import IMAGE_MIMETYPES, PNG_COMPRESSION, WEBP_QUALITY, encode_image, multipart_response, parse_format, wants_multipart
+from interpreter_pool import InterpreterPool, variant_path
+from jobs import JobQueue, QueueFull, WorkersUnavailable
+from pipeline import classify, generate_overlay, segment_image, segment_mode
+from preprocessing import REDUCED_DECODE, PreparedImage
+from readiness import Readiness, start_warm_up
+from result_cache import create_result_cache, file_version
+from results import ResultStore
 
 app = Flask(__name__)
 
 # Enable CORS for all routes
 CORS(app, origins=["http://localhost:5173", "http://127.0.0.1:5173"])
 
-# Load TFLite model
-interpreter = tf.lite.Interpreter(model_path="Model/model4.tflite")
-interpreter.allocate_tensors()
-input_details = interpreter.get_input_details()
-output_details = interpreter.get_output_details()
+# TFLITE_VARIANT=dynamic|float16|int8 serves a quantized model from convert_tflite.py
+TFLITE_MODEL_PATH = variant_path("Model/model4.tflite", os.environ.get("TFLITE_VARIANT"))
+
+# Job workers are spawned, so under `python aaa.py` each one re-imports this
+# file as __mp_main__. They load their own models in jobs._init_worker and
+# must not build the interpreter pool, batcher, Grad-CAM++ model, result
+# store and cache, batch executor, job queue or warm-up.
+SERVING = __name__ != "__mp_main__"
+
+if SERVING:
+    # Load TFLite model into a pool of interpreters, one checked out per batch
+    interpreter_pool = InterpreterPool(
+        TFLITE_MODEL_PATH,
+        size=int(os.environ.get("INTERPRETER_POOL_SIZE", 0)) or None,
+        num_threads=int(os.environ.get("INTERPRETER_NUM_THREADS", 1)),
+    )
+    input_details = interpreter_pool.input_details
+    output_details = interpreter_pool.output_details
 
-# Load H5 model for Grad-CAM++
-gradcam_model = tf.keras.models.load_model("Model/model4.h5")
+    # Micro-batching engine: concurrent requests share one invoke() per batch
+    batcher = BatchingEngine(
+        interpreter_pool,
+        max_batch_size=int(os.environ.get("BATCH_MAX_SIZE", 8)),
+        max_wait_ms=float(os.environ.get("BATCH_MAX_WAIT_MS", 5)),
+    )
 
-# Class labels
-class_names = ['EarlyPreB', 'PreB', 'ProB', 'Benign']
+    # Load H5 model for Grad-CAM++
+    gradcam_model = tf.keras.models.load_model("Model/model4.h5")
 
-# Preprocess the image
-def preprocess_image(image):
-    image = image.convert("RGB").resize((224, 224))
-    image = np.array(image).astype(np.float32) / 255.0
-    return np.expand_dims(image, axis=0)
+    # Recent predictions whose Grad-CAM++/segmentation can be fetched later
+    result_store = ResultStore(max_entries=int(os.environ.get("RESULT_STORE_SIZE", 256)))
+
+    # Content-addressed cache of responses and artifacts, invalidated when a model file changes
+    result_cache = create_result_cache(file_version(TFLITE_MODEL_PATH, "Model/model4.h5"))
 
 # Predict using TFLite
 def predict_tflite(img_array):
-    interpreter.set_tensor(input_details[0]['index'], img_array)
-    interpreter.invoke()
-    output_data = interpreter.get_tensor(output_details[0]['index'])
-    return output_data[0]
+    return batcher.predict(img_array)
 
-# ✅ Grad-CAM++ (your custom function)
-def grad_cam_plus(model, img_array, last_conv_layer_name="out_relu"):
-    try:
-        # Create gradient model
-        grad_model = tf.keras.models.Model(
-            model.inputs, 
-            [model.get_layer(last_conv_layer_name).output, model.output]
-        )
-        
-        with tf.GradientTape() as tape1:
-            with tf.GradientTape() as tape2:
-                # Get model outputs
-                outputs = grad_model(img_array)
-                conv_output = outputs[0]
-                predictions = outputs[1]
-                
-                # Handle case where predictions is a list
-                if isinstance(predictions, list):
-                    predictions = tf.convert_to_tensor(predictions)
-                
-                # Reshape predictions if needed
-                if len(predictions.shape) == 3 and predictions.shape[1] == 1:
-                    predictions = tf.squeeze(predictions, axis=1)
-                
-                # Get the predicted class (ensure it's a scalar)
-                pred_index = tf.argmax(predictions[0])
-                
-                # Get the class score for the predicted class
-                class_channel = tf.gather(predictions, pred_index, axis=1)
-            
-            first_grad = tape2.gradient(class_channel, conv_output)
-        second_grad = tape1.gradient(first_grad, conv_output)
-
-        # Handle None gradients
-        if first_grad is None or second_grad is None:
-            # Return a default heatmap if gradients are None
-            return np.zeros((224, 224, 3), dtype=np.uint8)
-
-        alpha_num = tf.square(first_grad)
-        alpha_denom = (2 * tf.square(first_grad)) + (second_grad * conv_output)
-        alpha_denom = tf.where(alpha_denom != 0.0, alpha_denom, tf.ones_like(alpha_denom))
-        alphas = alpha_num / alpha_denom
-
-        weights = tf.reduce_sum(alphas * tf.nn.relu(second_grad), axis=(1, 2))
-        cam = tf.reduce_sum(tf.multiply(weights[:, tf.newaxis, tf.newaxis, :], conv_output), axis=-1)
-        cam = tf.squeeze(cam)
-        cam = np.maximum(cam, 0)
-        
-        # Handle division by zero
-        cam_max = tf.reduce_max(cam)
-        if cam_max > 0:
-            cam /= cam_max
-        
-        cam = cv2.resize(cam.numpy(), (224, 224))
-        cam = np.uint8(255 * cam)
-        cam = cv2.applyColorMap(cam, cv2.COLORMAP_JET)
-        return cam
-    
-    except Exception as e:
-        print(f"Error in grad_cam_plus: {e}")
-        # Return a default heatmap on error
-        return np.zeros((224, 224, 3), dtype=np.uint8)
-
-# Generate overlay image from heatmap
-def generate_overlay(original_image, heatmap, alpha=0.4):
-    # Convert PIL image to OpenCV BGR for blending
-    image = original_image.resize((224, 224)).convert("RGB")
-    image_bgr = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-
-    # Resize heatmap and apply blending
-    heatmap = cv2.resize(heatmap, (224, 224))
-    heatmap = np.uint8(255 * heatmap) if heatmap.max() <= 1 else heatmap
-    heatmap = cv2.applyColorMap(heatmap, cv2.COLORMAP_JET)
-
-    overlay = cv2.addWeighted(image_bgr, 0.6, heatmap, 0.4, 0)
-    overlay_img = Image.fromarray(cv2.cvtColor(overlay, cv2.COLOR_BGR2RGB))
-
-    # Convert to base64 for return
-    buffered = io.BytesIO()
-    overlay_img.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
-
-# Segment image using KMeans + Morphology
-def segment_image(image_pil):
-    img = np.array(image_pil.resize((224, 224)).convert("RGB"))
-    i_lab = cv2.cvtColor(img, cv2.COLOR_RGB2LAB)
-    _, a, _ = cv2.split(i_lab)
-    flat_a = a.reshape((-1, 1))
-
-    km = KMeans(n_clusters=7, random_state=0, n_init=10).fit(flat_a)
-    clustered = km.cluster_centers_[km.labels_]
-    clustered_img = clustered.reshape(a.shape).astype(np.uint8)
-
-    _, binary_mask = cv2.threshold(clustered_img, 141, 255, cv2.THRESH_BINARY)
-    filled = ndi.binary_fill_holes(binary_mask)
-    cleaned1 = morphology.remove_small_objects(filled, 200)
-    cleaned2 = morphology.remove_small_holes(cleaned1, 250)
-    final_mask = cleaned2.astype(np.uint8)
-
-    segmented = cv2.bitwise_and(img, img, mask=final_mask)
-    segmented_img = Image.fromarray(segmented)
-
-    buffered = io.BytesIO()
-    segmented_img.save(buffered, format="PNG")
-    return base64.b64encode(buffered.getvalue()).decode("utf-8")
+# Explainability artifacts, computed lazily from the stored 224x224 image
+def build_gradcam(prepared):
+    intensity = grad_cam_plus_intensity(gradcam_model, prepared.normalized())
+    return generate_overlay(prepared, intensity)
+
+def build_segmented(prepared):
+    return segment_image(prepared)
+
+artifact_builders = {
+    "gradcam": build_gradcam,
+    "segmented": build_segmented,
+}
+
+def parse_include(value, default=tuple(artifact_builders)):
+    # /predict defaults to every artifact so existing clients get the full response
+    if value is None:
+        return list(default)
+    names = [name.strip() for name in value.split(",") if name.strip() and name.strip() != "none"]
+    unknown = [name for name in names if name not in artifact_builders]
+    if unknown:
+        raise ValueError(f"Unknown artifact(s): {', '.join(unknown)}")
+    return names
+
+# Server settings that change the output for the same upload and request options
+OUTPUT_SETTINGS = {
+    "segment_mode": segment_mode,
+    "reduced_decode": REDUCED_DECODE,
+    "png_compression": PNG_COMPRESSION,
+    "webp_quality": WEBP_QUALITY,
+}
+
+def artifact_cache_key(result_id, name, fmt):
+    return result_cache.key(result_id, artifact=name, format=fmt, **OUTPUT_SETTINGS)
+
+def get_encoded_artifact(result_id, name, fmt):
+    """Encoded bytes of an artifact from the result cache, or built from the stored inputs.
+
+    Returns None if neither the cache nor the result store knows the result.
+    """
+    key = artifact_cache_key(result_id, name, fmt)
+    data = result_cache.get(key)
+    if data is not None:
+        return data
+
+    def build(source):
+        return artifact_builders[name](PreparedImage(source))
+
+    def encode(**inputs):
+        return encode_image(result_store.get_artifact(result_id, name, build), fmt)
+    data = result_store.get_artifact(result_id, f"{name}.{fmt}", encode)
+    if data is not None:
+        result_cache.set(key, data)
+    return data
+
+def artifacts_reachable(result_id, include, fmt):
+    """True if every artifact URL handed out for this result can still be served."""
+    if result_id in result_store:
+        return True
+    if result_cache.backend is None:
+        return False
+    return all(result_cache.backend.get(artifact_cache_key(result_id, name, fmt)) is not None for name in include)
+
+def get_cached_result(digest, include, mode, fmt):
+    """Serialized JSON of an earlier identical request, or None."""
+    data = result_cache.get(result_cache.key(digest, include=include, mode=mode, format=fmt, **OUTPUT_SETTINGS))
+    if data is not None and mode == "url" and not artifacts_reachable(digest, include, fmt):
+        return None
+    return data
+
+def cache_result(digest, include, mode, fmt, data):
+    result_cache.set(result_cache.key(digest, include=include, mode=mode, format=fmt, **OUTPUT_SETTINGS), data)
+
+def parse_response_options():
+    """Read ?artifacts=inline|url and ?format=png|webp for artifact delivery."""
+    mode = request.args.get("artifacts", "inline")
+    if mode not in ("inline", "url"):
+        raise ValueError(f"Unknown artifacts mode: {mode}")
+    return mode, parse_format(request.args.get("format"))
+
+def build_result(prepared, predictions, include, mode="inline", fmt="png", result_id=None):
+    # Keep only the 224x224 uint8 image the artifacts need. Their other views,
+    # including the float32 model input, are rebuilt per artifact and not stored.
+    result_id = result_store.put({"source": prepared.compact_source()}, result_id)
+
+    result = {"result_id": result_id, **classify(predictions)}
+    if mode == "url":
+        # Clients fetch raw image bytes later; nothing is computed now
+        result["artifacts"] = {
+            name: url_for("get_result_artifact", result_id=result_id, artifact=f"{name}.{fmt}")
+            for name in include
+        }
+    elif mode == "inline":
+        for name in include:
+            result[name] = base64.b64encode(get_encoded_artifact(result_id, name, fmt)).decode("utf-8")
+    return result
 
 @app.route("/predict", methods=["POST"])
 def predict():
@@ -154,40 +169,263 @@ def predict():
     file = request.files['file']
     if file.filename == '':
         return jsonify({"error": "No file selected"}), 400
+
+    try:
+        include = parse_include(request.args.get("include"))
+        mode, fmt = parse_response_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
         
+    # Identical uploads share a result ID and hit the result cache
+    data = file.read()
+    digest = result_cache.digest(data)
+    multipart = wants_multipart(request)
+    if not multipart:
+        cached = get_cached_result(digest, include, mode, fmt)
+        if cached is not None:
+            return Response(cached, mimetype="application/json")
+
     try:
-        img = Image.open(file.stream)
+        prepared = PreparedImage.from_bytes(data, min_size=(224, 224))
     except Exception as e:
         return jsonify({"error": f"Invalid image format: {str(e)}"}), 400
 
     try:
-        img_array = preprocess_image(img)
-
         # Run prediction
-        predictions = predict_tflite(img_array)
-        predicted_class_index = int(np.argmax(predictions))
-        predicted_class_name = class_names[predicted_class_index]
-        confidence = float(np.max(predictions))
-
-        # Grad-CAM++ using your function
-        heatmap = grad_cam_plus(gradcam_model, img_array)
-        gradcam_b64 = generate_overlay(img, heatmap)
-
-        # Segmentation
-        segmented_b64 = segment_image(img)
-
-        return jsonify({
-            "predictions": predictions.tolist(),
-            "predicted_class": predicted_class_index,
-            "predicted_class_name": predicted_class_name,
-            "confidence": confidence,
-            "gradcam": gradcam_b64,
-            "segmented": segmented_b64
-        })
+        predictions = predict_tflite(prepared.normalized())
+
+        # Accept: multipart/mixed streams JSON metadata plus raw image parts
+        if multipart:
+            result = build_result(prepared, predictions, include, mode="none", result_id=digest)
+            parts = [
+                (name, fmt, lambda name=name: get_encoded_artifact(result["result_id"], name, fmt))
+                for name in include
+            ]
+            return multipart_response(result, parts)
+
+        response = jsonify(build_result(prepared, predictions, include, mode, fmt, result_id=digest))
+        cache_result(digest, include, mode, fmt, response.get_data())
+        return response
     
     except Exception as e:
         return jsonify({"error": f"Processing failed: {str(e)}"}), 500
 
+# Batch prediction limits
+BATCH_MAX_IMAGES = int(os.environ.get("BATCH_MAX_IMAGES", 500))
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 32))
+# Cap on the uncompressed size of all images in one batch, checked before zip members are read
+BATCH_MAX_BYTES = int(os.environ.get("BATCH_MAX_BYTES", 512 * 1024 * 1024))
+
+if SERVING:
+    # Shared pool for decoding uploads and running batch chunks
+    batch_executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 4, thread_name_prefix="batch")
+
+class BatchTooLarge(Exception):
+    pass
+
+def check_batch_limits(count, size):
+    if count > BATCH_MAX_IMAGES:
+        raise BatchTooLarge(f"Too many images ({count} > {BATCH_MAX_IMAGES})")
+    if size > BATCH_MAX_BYTES:
+        raise BatchTooLarge(f"Upload too large ({size} > {BATCH_MAX_BYTES} bytes uncompressed)")
+
+def collect_batch_uploads(files):
+    """Return (filename, bytes) for every uploaded image, expanding zip archives.
+
+    Zip members are counted and their uncompressed sizes summed from the
+    archive directory before any is read, so zip bombs and huge archives
+    raise BatchTooLarge without being inflated. zipfile never inflates a
+    member past its declared size.
+    """
+    uploads = []
+    total_size = 0
+    for file in files:
+        if file.filename and file.filename.lower().endswith(".zip"):
+            with zipfile.ZipFile(file.stream) as archive:
+                members = [
+                    info for info in archive.infolist()
+                    if not (info.is_dir() or info.filename.startswith("__MACOSX/")
+                            or os.path.basename(info.filename).startswith("."))
+                ]
+                total_size += sum(info.file_size for info in members)
+                check_batch_limits(len(uploads) + len(members), total_size)
+                for info in members:
+                    uploads.append((info.filename, archive.read(info)))
+        elif file.filename != '':
+            data = file.read()
+            total_size += len(data)
+            check_batch_limits(len(uploads) + 1, total_size)
+            uploads.append((file.filename or file.name, data))
+    return uploads
+
+def decode_upload(data):
+    prepared = PreparedImage.from_bytes(data, min_size=(224, 224))
+    prepared.normalized()
+    return prepared
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    files = request.files.getlist('files') + request.files.getlist('file')
+    if not files:
+        return jsonify({"error": "No files uploaded"}), 400
+
+    try:
+        include = parse_include(request.args.get("include"), default=())
+        mode, fmt = parse_response_options()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        uploads = collect_batch_uploads(files)
+    except zipfile.BadZipFile as e:
+        return jsonify({"error": f"Invalid zip archive: {str(e)}"}), 400
+    except BatchTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    if not uploads:
+        return jsonify({"error": "No images found in upload"}), 400
+    # Artifact URLs point into the result store, so a larger url-mode batch
+    # would evict its own first results before the client could fetch them
+    if mode == "url" and include and len(uploads) > result_store.max_entries:
+        return jsonify({"error": f"Too many images for artifacts=url ({len(uploads)} > {result_store.max_entries}); "
+                                 f"send smaller batches or use artifacts=inline"}), 413
+
+    # Serve previously seen images from the result cache
+    results = [None] * len(uploads)
+    digests = [result_cache.digest(data) for _, data in uploads]
+    pending = []
+    for i, (filename, data) in enumerate(uploads):
+        cached = get_cached_result(digests[i], include, mode, fmt)
+        if cached is not None:
+            results[i] = {"filename": filename, **json.loads(cached)}
+        else:
+            pending.append(i)
+
+    # Decode and preprocess the rest in parallel; PIL releases the GIL while decoding
+    decode_futures = [batch_executor.submit(decode_upload, uploads[i][1]) for i in pending]
+    decoded = []
+    for i, future in zip(pending, decode_futures):
+        try:
+            decoded.append((i, future.result()))
+        except Exception as e:
+            results[i] = {"filename": uploads[i][0], "error": f"Invalid image format: {str(e)}"}
+
+    try:
+        # Run the classifier over stacked chunks, one pooled interpreter each
+        chunks = [decoded[start:start + BATCH_CHUNK_SIZE] for start in range(0, len(decoded), BATCH_CHUNK_SIZE)]
+        chunk_futures = [
+            batch_executor.submit(interpreter_pool.run, np.concatenate([item[1].normalized() for item in chunk], axis=0))
+            for chunk in chunks
+        ]
+        for chunk, future in zip(chunks, chunk_futures):
+            for (i, prepared), predictions in zip(chunk, future.result()):
+                result = build_result(prepared, predictions, include, mode, fmt, result_id=digests[i])
+                cache_result(digests[i], include, mode, fmt, json.dumps(result).encode("utf-8"))
+                results[i] = {"filename": uploads[i][0], **result}
+
+        return jsonify({"count": len(results), "results": results})
+
+    except Exception as e:
+        return jsonify({"error": f"Processing failed: {str(e)}"}), 500
+
+# Fetch a Grad-CAM++ or segmentation artifact for an earlier prediction.
+# "<artifact>.png" / "<artifact>.webp" return raw image bytes, a bare name returns base64 JSON.
+@app.route("/results/<result_id>/<artifact>", methods=["GET"])
+def get_result_artifact(result_id, artifact):
+    name, _, ext = artifact.partition(".")
+    if name not in artifact_builders or (ext and ext not in IMAGE_MIMETYPES):
+        return jsonify({"error": f"Unknown artifact: {artifact}"}), 404
+
+    try:
+        data = get_encoded_artifact(result_id, name, ext or "png")
+    except Exception as e:
+        return jsonify({"error": f"Processing failed: {str(e)}"}), 500
+    if data is None:
+        return jsonify({"error": "Result not found or expired"}), 404
+
+    if ext:
+        return Response(data, mimetype=IMAGE_MIMETYPES[ext])
+    return jsonify({"result_id": result_id, name: base64.b64encode(data).decode("utf-8")})
+
+if SERVING:
+    # Background jobs for heavy Grad-CAM++/segmentation requests, run in worker processes
+    job_queue = JobQueue(
+        os.environ.get("JOB_DB_PATH", os.path.join(tempfile.gettempdir(), "hemadetect-jobs.sqlite3")),
+        TFLITE_MODEL_PATH,
+        "Model/model4.h5",
+        workers=int(os.environ.get("JOB_WORKERS", 2)),
+        max_pending=int(os.environ.get("JOB_MAX_PENDING", 64)),
+    )
+
+@app.route("/jobs", methods=["POST"])
+def submit_job():
+    if 'file' not in request.files:
+        return jsonify({"error": "No file uploaded"}), 400
+
+    file = request.files['file']
+    if file.filename == '':
+        return jsonify({"error": "No file selected"}), 400
+
+    try:
+        include = parse_include(request.args.get("include"))
+        fmt = parse_format(request.args.get("format"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        job_id = job_queue.submit(file.read(), include, fmt)
+    except QueueFull:
+        # Backpressure: tell the client to retry instead of queueing unbounded work
+        response = jsonify({"error": "Job queue is full, retry later"})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+    except WorkersUnavailable as e:
+        return jsonify({"error": f"Job workers unavailable: {str(e)}"}), 503
+
+    return jsonify({
+        "job_id": job_id,
+        "status": "queued",
+        "status_url": url_for("get_job", job_id=job_id)
+    }), 202
+
+@app.route("/jobs/<job_id>", methods=["GET"])
+def get_job(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Job not found or expired"}), 404
+    return jsonify(job)
+
+@app.route("/jobs/stats", methods=["GET"])
+def job_stats():
+    return jsonify(job_queue.stats())
+
+# Result cache hit/miss counters for this worker
+@app.route("/cache/stats", methods=["GET"])
+def cache_stats():
+    return jsonify(result_cache.stats())
+
+# Push synthetic inputs through the classifier, Grad-CAM++, segmentation and
+# encoders so the first real request doesn't pay for lazy initialization
+def warm_up_steps():
+    rng = np.random.default_rng(0)
+    prepared = PreparedImage(Image.fromarray(rng.integers(0, 256, (224, 224, 3), dtype=np.uint8)))
+    return {
+        "interpreters": interpreter_pool.warm_up,
+        "gradcam": lambda: [encode_image(build_gradcam(prepared), fmt) for fmt in IMAGE_MIMETYPES],
+        "segmentation": lambda: [encode_image(build_segmented(prepared), fmt) for fmt in IMAGE_MIMETYPES],
+    }
+
+# WARM_UP_MODELS=1 warms before serving, "background" while serving, 0 skips.
+# A model step that fails keeps /ready at 503.
+readiness = Readiness()
+if SERVING:
+    start_warm_up(readiness, warm_up_steps(), os.environ.get("WARM_UP_MODELS", "1"),
+                  required=("interpreters", "gradcam"))
+
+# Readiness for load balancers: 503 until warm-up has finished, or for good if a model failed
+@app.route("/ready", methods=["GET"])
+def ready():
+    return jsonify(readiness.status()), 200 if readiness.ready else 503
+
 # Add a health check endpoint
 @app.route("/health", methods=["GET"])
 def health_check():
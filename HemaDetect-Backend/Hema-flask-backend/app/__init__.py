@@ -1,7 +1,10 @@
 from flask import Flask
 from flask_cors import CORS
 from .routes import init_routes
+from .warmup import warm_up_steps
+from readiness import Readiness, start_warm_up
 import logging
+import os
 
 logger = logging.getLogger(__name__)
 
@@ -12,5 +15,14 @@ def create_app():
     CORS(app) 
     logger.info("Initializing routes...")
     init_routes(app)
+    # /ready answers 503 until every model and rendering path has run once.
+    # WARM_UP_MODELS=1 warms before returning, "background" while serving,
+    # 0 defers model loading to the first request.
+    readiness = Readiness()
+    app.extensions['readiness'] = readiness
+    logger.info("Loading and warming up models...")
+    # A failed model load keeps /ready at 503 instead of taking traffic
+    start_warm_up(readiness, warm_up_steps(), os.environ.get('WARM_UP_MODELS', '1'),
+                  required=('classifier', 'segmentation_model'))
     logger.info("Application created successfully")
     return app
\ No newline at end of file
@@ -0,0 +1,123 @@
+import logging
+import os
+import threading
+
+import numpy as np
+
+from interpreter_pool import InterpreterPool, variant_path
+
+from .model_registry import get_model, shared_instances
+
+logger = logging.getLogger(__name__)
+
+# INFERENCE_BACKEND=auto serves a model through TFLite when a .tflite file sits
+# next to its .h5 and through Keras otherwise; "tflite" or "keras" forces one
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'auto')
+# TFLITE_VARIANT=dynamic|float16|int8 picks a convert_tflite.py variant
+TFLITE_VARIANT = os.environ.get('TFLITE_VARIANT')
+# Interpreters per TFLite model, one per concurrently served request
+TFLITE_POOL_SIZE = int(os.environ.get('TFLITE_POOL_SIZE', 0)) or None
+TFLITE_NUM_THREADS = int(os.environ.get('TFLITE_NUM_THREADS', 1))
+
+# Registry model instance id -> (model, CompiledModel)
+_compiled = {}
+# TFLite file -> (mtime, TFLiteModel)
+_tflite = {}
+_lock = threading.Lock()
+
+
+class CompiledModel:
+    """Low-overhead single-call inference for a Keras model.
+
+    `model.predict()` builds a data adapter, callbacks and a step function on
+    every call, which costs more than the forward pass at batch size 1. This
+    traces the forward pass once into a `tf.function` with a fixed
+    `TensorSpec` and returns NumPy arrays directly.
+    """
+
+    backend = 'keras'
+
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.model = model
+        self.input_shape = tuple(model.inputs[0].shape[1:])
+        self._forward = tf.function(
+            lambda x: model(x, training=False),
+            input_signature=[tf.TensorSpec((None, *self.input_shape), tf.float32)]
+        )
+
+    def __call__(self, x):
+        return self._forward(np.asarray(x, np.float32)).numpy()
+
+    def warm_up(self):
+        """Trace the graph with a dummy batch so the first request doesn't pay for it."""
+        self(np.zeros((1, *self.input_shape), np.float32))
+
+
+class TFLiteModel:
+    """The same call interface as CompiledModel, backed by pooled TFLite interpreters."""
+
+    backend = 'tflite'
+
+    def __init__(self, path):
+        self.path = path
+        self.pool = InterpreterPool(path, size=TFLITE_POOL_SIZE, num_threads=TFLITE_NUM_THREADS)
+        self.input_shape = tuple(int(d) for d in self.pool.input_details[0]['shape'][1:])
+
+    def __call__(self, x):
+        return self.pool.run(np.asarray(x, np.float32))
+
+    def warm_up(self):
+        self.pool.warm_up()
+
+
+def tflite_path(path):
+    """The .tflite file that serves the Keras model at `path`, or None if there is none."""
+    if INFERENCE_BACKEND == 'keras':
+        return None
+    candidate = variant_path(os.path.splitext(path)[0] + '.tflite', TFLITE_VARIANT)
+    if os.path.exists(candidate):
+        return candidate
+    if INFERENCE_BACKEND == 'tflite':
+        raise FileNotFoundError(f"INFERENCE_BACKEND=tflite but {candidate} does not exist")
+    return None
+
+
+def get_compiled_model(path):
+    """Return the CompiledModel wrapping the registry's shared model for `path`."""
+    model = get_model(path)
+    with _lock:
+        entry = _compiled.get(id(model))
+        if entry is None:
+            # Holding `model` in the entry keeps its id from being reused
+            entry = (model, CompiledModel(model))
+            _compiled[id(model)] = entry
+
+            # Forget wrappers of models the registry has since replaced
+            live = {id(m) for m in shared_instances()}
+            for stale in [key for key in _compiled if key not in live]:
+                del _compiled[stale]
+        return entry[1]
+
+
+def get_inference_model(path):
+    """Return a callable model for the Keras file `path` on the configured backend.
+
+    Uses TFLite when a converted sibling exists (see `tflite_path`),
+    reloading it if the file changes, and the compiled Keras model otherwise.
+    """
+    tflite_file = tflite_path(path)
+    if tflite_file is None:
+        return get_compiled_model(path)
+
+    tflite_file = os.path.abspath(tflite_file)
+    mtime = os.stat(tflite_file).st_mtime
+    with _lock:
+        entry = _tflite.get(tflite_file)
+        if entry is None or entry[0] != mtime:
+            logger.info(f"Loading TFLite model {tflite_file}...")
+            entry = (mtime, TFLiteModel(tflite_file))
+            _tflite[tflite_file] = entry
+        return entry[1]
+
@@ -0,0 +1,78 @@
+import hashlib
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Model files served by the routes, relative to the working directory
+CLASSIFIER_MODEL_PATH = 'best_model_mel_nv.h5'
+SEGMENTATION_MODEL_PATH = 'modelmask.h5'
+
+# Loaded models keyed by content hash, so identical files share one instance
+_models = {}
+# Absolute path -> (mtime, size, content hash), so the file is only re-hashed when it changes
+_hashes = {}
+_lock = threading.Lock()
+
+
+def _file_hash(path):
+    stat = os.stat(path)
+    cached = _hashes.get(path)
+    if cached and cached[:2] == (stat.st_mtime, stat.st_size):
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    _hashes[path] = (stat.st_mtime, stat.st_size, digest.hexdigest())
+    return _hashes[path][2]
+
+
+def get_model(path):
+    """Return the shared Keras model for `path`, loading it on first use.
+
+    Every route asking for the same file gets the same instance, so a model
+    used by several routes is deserialized and held in memory only once.
+    """
+    path = os.path.abspath(path)
+    with _lock:
+        digest = _file_hash(path)
+        model = _models.get(digest)
+        if model is None:
+            logger.info(f"Loading model {path}...")
+            # Imported here so TFLite-only workers never load TensorFlow
+            import tensorflow as tf
+            model = tf.keras.models.load_model(path)
+            _models[digest] = model
+
+            # Drop copies whose file has since been replaced on disk
+            in_use = {cached[2] for cached in _hashes.values()}
+            for stale in [d for d in _models if d not in in_use]:
+                del _models[stale]
+        return model
+
+
+def warm_up(paths):
+    """Load every model in `paths` now instead of on the first request.
+
+    A model that fails to load is logged and left to fail on the request
+    that needs it, so one missing file doesn't take down the other routes.
+    """
+    for path in paths:
+        try:
+            get_model(path)
+        except Exception as e:
+            logger.error(f"Failed to load model {path}: {str(e)}")
+
+
+def loaded_models():
+    """Map each loaded model file to the content hash it was loaded from."""
+    return {path: cached[2] for path, cached in _hashes.items() if cached[2] in _models}
+
+
+def shared_instances():
+    """Return the model instances currently held by the registry."""
+    with _lock:
+        return list(_models.values())
@@ -1,6 +1,12 @@
-from flask import jsonify
+from flask import current_app, jsonify
 
 def register_home_route(app):
     @app.route('/', methods=['GET'])
     def home():
         return jsonify({"mini": "project"}), 200
+
+    # Readiness for load balancers: 503 until warm-up has finished, or for good if a model failed
+    @app.route('/ready', methods=['GET'])
+    def ready():
+        readiness = current_app.extensions['readiness']
+        return jsonify(readiness.status()), 200 if readiness.ready else 503
@@ -199,80 +199,134 @@
 
 
 from flask import request, jsonify, Flask
-import tensorflow as tf
 import io
 from PIL import Image
 import numpy as np
 import cv2
-import base64
+from functools import cached_property
 
-# Load only the classifier model
-classifier_model = tf.keras.models.load_model('best_model_mel_nv.h5')
+from image_encoding import encode_base64, encode_image, multipart_response, parse_format, wants_multipart
+from preprocessing import PreparedImage, decode_bgr
+
+from ..inference import get_inference_model
+from ..model_registry import CLASSIFIER_MODEL_PATH
 
 IMG_SIZE = (224, 224)
 
-def preprocess_for_classifier(img_array):
-    img_array = cv2.resize(img_array, IMG_SIZE)
+def preprocess_for_classifier(prepared):
+    img_array = prepared.bgr(IMG_SIZE)
     img_array = img_array / 255.0
     return np.expand_dims(img_array, axis=0)
 
-def segment_skin_lesion(image):
-    # Resize for consistent processing
-    img = cv2.resize(image, (300, 300))
-    
-    # Convert to grayscale
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    
-    # Apply Gaussian blur to reduce noise
-    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-    
-    # Apply adaptive thresholding 
-    thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-                                  cv2.THRESH_BINARY_INV, 11, 2)
-    
-    # Another approach: Otsu's thresholding
-    _, otsu = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-    
-    # Combine the two approaches for better results
-    combined = cv2.bitwise_or(thresh, otsu)
-    
-    # Find contours
-    contours, _ = cv2.findContours(combined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    
-    # Create a blank mask
-    mask = np.zeros_like(gray)
-    
-    # If contours are found, find the largest one (likely the lesion)
-    if contours:
-        # Get the largest contour
-        largest_contour = max(contours, key=cv2.contourArea)
+class SegmentationResult:
+    """Lesion segmentation of one image and everything derived from it.
+
+    The mask is computed once at 300x300; contours, area, perimeter, the
+    metrics and both overlays are derived lazily from it and cached, so
+    metrics and rendering never repeat the thresholding or contour search.
+    """
+
+    SIZE = (300, 300)
+
+    def __init__(self, prepared):
+        self.image = prepared.source
+        # Resized views come from the shared preprocessing stage
+        self.resized = prepared.bgr(self.SIZE)
+        self.mask, self.lesion_contour = self._segment(prepared.gray(self.SIZE))
+
+    @staticmethod
+    def _segment(gray):
         
-        # Only proceed if the contour is sufficiently large
-        if cv2.contourArea(largest_contour) > 100:
-            # Fill the contour
-            cv2.drawContours(mask, [largest_contour], 0, 255, -1)
+        # Apply Gaussian blur to reduce noise
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        
+        # Apply adaptive thresholding 
+        thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
+                                      cv2.THRESH_BINARY_INV, 11, 2)
+        
+        # Another approach: Otsu's thresholding
+        _, otsu = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        
+        # Combine the two approaches for better results
+        combined = cv2.bitwise_or(thresh, otsu)
+        
+        # Find contours
+        contours, _ = cv2.findContours(combined, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        # Create a blank mask
+        mask = np.zeros_like(gray)
+        lesion_contour = None
+        
+        # If contours are found, find the largest one (likely the lesion)
+        if contours:
+            # Get the largest contour
+            largest_contour = max(contours, key=cv2.contourArea)
             
-            # Optional: smoothen the mask
-            mask = cv2.GaussianBlur(mask, (9, 9), 0)
-            _, mask = cv2.threshold(mask, 127, 255, cv2.THRESH_BINARY)
-    
-    # Create color overlay for visualization
-    # Convert mask to 3-channel
-    color_mask = np.zeros_like(img)
-    lesion_area = (mask > 0)
-    
-    # Create a semi-transparent red overlay
-    color_mask[lesion_area] = [0, 0, 255]  # Red in BGR
-    
-    # Blend with original image for better visualization
-    alpha = 0.6  # Transparency factor
-    overlay = cv2.addWeighted(img, 1, color_mask, alpha, 0)
-    
-    # Draw contour on the overlay for better visualization
-    if contours and cv2.contourArea(largest_contour) > 100:
-        cv2.drawContours(overlay, [largest_contour], 0, (0, 255, 255), 2)  # Yellow contour
-    
-    return mask, overlay
+            # Only proceed if the contour is sufficiently large
+            if cv2.contourArea(largest_contour) > 100:
+                lesion_contour = largest_contour
+
+                # Fill the contour
+                cv2.drawContours(mask, [largest_contour], 0, 255, -1)
+                
+                # Optional: smoothen the mask
+                mask = cv2.GaussianBlur(mask, (9, 9), 0)
+                _, mask = cv2.threshold(mask, 127, 255, cv2.THRESH_BINARY)
+        
+        return mask, lesion_contour
+
+    @cached_property
+    def mask_contour(self):
+        """Largest external contour of the final (smoothed) mask, or None."""
+        contours, _ = cv2.findContours(self.mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        if not contours:
+            return None
+        return max(contours, key=cv2.contourArea)
+
+    @cached_property
+    def area(self):
+        return cv2.contourArea(self.mask_contour) if self.mask_contour is not None else 0
+
+    @cached_property
+    def perimeter(self):
+        return cv2.arcLength(self.mask_contour, True) if self.mask_contour is not None else 0
+
+    @property
+    def lesion_area_percentage(self):
+        return (np.sum(self.mask > 0) / self.mask.size) * 100
+
+    @property
+    def border_complexity(self):
+        # Perimeter-to-area ratio, 1.0 for a perfect circle
+        return self.perimeter**2 / (4 * np.pi * self.area) if self.area > 0 else 0
+
+    @cached_property
+    def overlay(self):
+        """Red lesion overlay with a yellow outline on the 300x300 image."""
+        # Create color overlay for visualization
+        color_mask = np.zeros_like(self.resized)
+        lesion_area = (self.mask > 0)
+        
+        # Create a semi-transparent red overlay
+        color_mask[lesion_area] = [0, 0, 255]  # Red in BGR
+        
+        # Blend with original image for better visualization
+        alpha = 0.6  # Transparency factor
+        overlay = cv2.addWeighted(self.resized, 1, color_mask, alpha, 0)
+        
+        # Draw contour on the overlay for better visualization
+        if self.lesion_contour is not None:
+            cv2.drawContours(overlay, [self.lesion_contour], 0, (0, 255, 255), 2)  # Yellow contour
+        
+        return overlay
+
+    @cached_property
+    def heatmap_overlay(self):
+        """Jet heatmap of the mask blended over the full-resolution image."""
+        return create_heatmap_overlay(self.image, self.mask)
+
+def segment_skin_lesion(prepared):
+    return SegmentationResult(prepared)
 
 def create_heatmap_overlay(image, binary_mask):
     """Create a heatmap overlay to highlight the lesion area"""
@@ -288,14 +342,9 @@ def create_heatmap_overlay(image, binary_mask):
     
     return overlay
 
-def postprocess_mask(mask, original_image):
-    """Convert mask to base64 for sending to frontend"""
-    # Get a colored visualization of the mask
-    _, overlay = segment_skin_lesion(original_image)
-    
-    # Encode the overlay as a PNG image
-    _, buffer = cv2.imencode('.png', overlay)
-    return base64.b64encode(buffer).decode('utf-8')
+def postprocess_mask(segmentation, fmt='png'):
+    """Convert the segmentation overlay to base64 for sending to frontend"""
+    return encode_base64(segmentation.overlay, fmt)
 
 def interpret_prediction(pred):
     mel_prob = pred[0]
@@ -311,63 +360,64 @@ def register_predict_route(app):
         if 'image' not in request.files:
             return jsonify({'error': 'Image is required'}), 400
         
+        try:
+            fmt = parse_format(request.args.get('format'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         try:
             # Get image file
             file = request.files['image']
             
             # Read image
             img_bytes = file.read()
-            nparr = np.frombuffer(img_bytes, np.uint8)
-            img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+            # The heatmap is returned at the decoded resolution, so decode in full
+            # unless ?reduced=1 accepts a heatmap at the smallest JPEG scale that
+            # still covers the 300x300 segmentation input
+            reduced = request.args.get('reduced') == '1'
+            img = decode_bgr(img_bytes, min_size=SegmentationResult.SIZE if reduced else None)
             
             if img is None:
                 return jsonify({'error': 'Invalid image format'}), 400
             
+            # Decode once; classifier and segmentation share the resized views
+            prepared = PreparedImage(img)
+            
             # Process for classification
-            classifier_input = preprocess_for_classifier(img)
-            classification_result = classifier_model.predict(classifier_input)[0]
+            classifier_model = get_inference_model(CLASSIFIER_MODEL_PATH)
+            classifier_input = preprocess_for_classifier(prepared)
+            classification_result = classifier_model(classifier_input)[0]
             mel_prob = float(classification_result[0])
             nv_prob = float(classification_result[1])
             
-            # Process for segmentation using OpenCV
-            binary_mask, overlay = segment_skin_lesion(img)
-            
-            # Create heatmap visualization
-            heatmap_overlay = create_heatmap_overlay(img, binary_mask)
-            
-            # Convert overlay to base64
-            _, buffer = cv2.imencode('.png', heatmap_overlay)
-            segmentation_mask = base64.b64encode(buffer).decode('utf-8')
-            
-            # Calculate lesion characteristics based on mask
-            lesion_area_percentage = (np.sum(binary_mask > 0) / binary_mask.size) * 100
-            
-            # Calculate border complexity (perimeter-to-area ratio)
-            contours, _ = cv2.findContours(binary_mask.astype(np.uint8), cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-            if contours:
-                largest_contour = max(contours, key=cv2.contourArea)
-                perimeter = cv2.arcLength(largest_contour, True)
-                area = cv2.contourArea(largest_contour)
-                border_complexity = perimeter**2 / (4 * np.pi * area) if area > 0 else 0
-            else:
-                border_complexity = 0
+            # Segment once; metrics and rendering reuse the same result
+            segmentation = segment_skin_lesion(prepared)
             
             # Additional segmentation details to return
             segmentation_details = {
-                "lesion_area_percentage": float(lesion_area_percentage),
-                "border_complexity": float(border_complexity)
+                "lesion_area_percentage": float(segmentation.lesion_area_percentage),
+                "border_complexity": float(segmentation.border_complexity)
             }
             
             # Prepare response
-            return jsonify({
+            response = {
                 'diagnosis': {
                     'Melanoma': mel_prob,
                     'Nevus': nv_prob
                 },
                 'interpretation': interpret_prediction([mel_prob, nv_prob]),
-                'segmentation_mask': segmentation_mask,
                 'segmentation_details': segmentation_details
-            })
+            }
+            
+            # Accept: multipart/mixed sends the heatmap as a raw image part
+            if wants_multipart(request):
+                return multipart_response(response, [
+                    ('segmentation_mask', fmt, lambda: encode_image(segmentation.heatmap_overlay, fmt))
+                ])
+            
+            # Convert heatmap visualization to base64
+            response['segmentation_mask'] = encode_base64(segmentation.heatmap_overlay, fmt)
+            return jsonify(response)
         
         except Exception as e:
             print(f"Error processing image: {str(e)}")
@@ -1,14 +1,24 @@
 from flask import request, jsonify, Flask
-import tensorflow as tf
-import io
-from PIL import Image
 import numpy as np
 import cv2
 import base64
+
+from preprocessing import open_image
+
+from ..inference import get_inference_model
+from ..model_registry import CLASSIFIER_MODEL_PATH
+
 IMG_SIZE = (224, 224)
 # classifier_model = load_model('melanoma_nevus_model.h5')
 # segmentation_model = load_model('modelmask.h5')
-model = tf.keras.models.load_model('best_model_mel_nv.h5')
+
+# ImageNet channel means subtracted by ResNet50's "caffe" preprocessing, in BGR order
+RESNET50_MEAN_BGR = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+
+def resnet50_preprocess(image):
+    """NumPy equivalent of keras' resnet50.preprocess_input on an RGB image."""
+    img_array = np.asarray(image, dtype=np.float32)[..., ::-1]
+    return img_array - RESNET50_MEAN_BGR
 
 def preprocess_for_classifier(image):
     image = image.resize((224, 224))
@@ -37,7 +47,10 @@ def interpret_prediction(pred):
 def register_predictthree_route(app):
     @app.route('/predictthree', methods=['POST'])
     def predictthree():
-        if model is None:
+        try:
+            model = get_inference_model(CLASSIFIER_MODEL_PATH)
+        except Exception as e:
+            app.logger.error(f"Model load error: {str(e)}")
             return jsonify({'error': 'Model not loaded'}), 500
         if 'image' not in request.files:
             return jsonify({'error': 'Image is required'}), 400
@@ -51,7 +64,7 @@ def register_predictthree_route(app):
             
             # Process image
             img_bytes = file.read()
-            img = Image.open(io.BytesIO(img_bytes))
+            img = open_image(img_bytes, min_size=IMG_SIZE)
             
             # Convert to RGB if needed
             if img.mode != 'RGB':
@@ -59,12 +72,11 @@ def register_predictthree_route(app):
             
             # Resize and preprocess
             img = img.resize(IMG_SIZE)
-            img_array = tf.keras.preprocessing.image.img_to_array(img)
-            img_array = tf.keras.applications.resnet50.preprocess_input(img_array)
+            img_array = resnet50_preprocess(img)
             img_array = np.expand_dims(img_array, axis=0)
             
             # Make prediction
-            predictions = model.predict(img_array)[0]
+            predictions = model(img_array)[0]
             mel_prob = float(predictions[0])
             nv_prob = float(predictions[1])
             
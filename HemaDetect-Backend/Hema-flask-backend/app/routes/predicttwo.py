@@ -1,29 +1,63 @@
 from flask import request, jsonify, Flask
-import tensorflow as tf
 import io
+import threading
 from PIL import Image
 import numpy as np
 import cv2
-import base64
 
-# Load both models
-classifier_model = tf.keras.models.load_model('best_model_mel_nv.h5')
-segmentation_model = tf.keras.models.load_model('modelmask.h5')
+from image_encoding import encode_base64, encode_image, multipart_response, parse_format, wants_multipart
+from preprocessing import decode_bgr
+
+from ..inference import get_inference_model
+from ..model_registry import CLASSIFIER_MODEL_PATH, SEGMENTATION_MODEL_PATH
 
 IMG_SIZE = (224, 224)
 SEG_SIZE = (128, 128)
 
-def preprocess_for_classifier(img_array):
-    img_array = cv2.resize(img_array, IMG_SIZE)
-    img_array = img_array / 255.0
-    return np.expand_dims(img_array, axis=0)
+# Compiled fused inference function and the model pair it was built for
+_fused = {'models': None, 'fn': None}
+_fused_lock = threading.Lock()
+
+def build_fused_inference(classifier_model, segmentation_model):
+    """Compile one graph that normalizes the decoded image, resizes it for
+    both models and runs the classifier and segmentation model together."""
+    import tensorflow as tf
+
+    @tf.function(input_signature=[tf.TensorSpec((None, None, 3), tf.uint8)])
+    def fused_inference(image):
+        image = tf.cast(image, tf.float32)[tf.newaxis] / 255.0
+        classifier_input = tf.image.resize(image, IMG_SIZE)
+        segmentation_input = tf.image.resize(image, SEG_SIZE)
+        return (classifier_model(classifier_input, training=False),
+                segmentation_model(segmentation_input, training=False))
+
+    def run(image):
+        return tuple(output.numpy() for output in fused_inference(image))
+    return run
 
-def preprocess_for_segmentation(img_array):
-    img_array = cv2.resize(img_array, SEG_SIZE)
-    img_array = img_array / 255.0
-    return np.expand_dims(img_array, axis=0)
+def build_separate_inference(classifier_model, segmentation_model):
+    """Same steps for models on the TFLite backend, which can't share a graph."""
+    def run(image):
+        image = image.astype(np.float32) / 255.0
+        # Bilinear with half-pixel centers, like tf.image.resize in the fused graph
+        return (classifier_model(cv2.resize(image, IMG_SIZE)[np.newaxis]),
+                segmentation_model(cv2.resize(image, SEG_SIZE)[np.newaxis]))
+    return run
 
-def postprocess_mask(mask):
+def get_fused_inference():
+    classifier_model = get_inference_model(CLASSIFIER_MODEL_PATH)
+    segmentation_model = get_inference_model(SEGMENTATION_MODEL_PATH)
+    # Rebuild only if the backend handed out different model instances
+    with _fused_lock:
+        if _fused['models'] != (classifier_model, segmentation_model):
+            if classifier_model.backend == segmentation_model.backend == 'keras':
+                _fused['fn'] = build_fused_inference(classifier_model.model, segmentation_model.model)
+            else:
+                _fused['fn'] = build_separate_inference(classifier_model, segmentation_model)
+            _fused['models'] = (classifier_model, segmentation_model)
+        return _fused['fn']
+
+def mask_to_image(mask):
     # Extract the mask and convert to a proper image format
     mask = mask[0, :, :, 0]
     mask = (mask * 255).astype(np.uint8)
@@ -34,10 +68,11 @@ def postprocess_mask(mask):
     colored_mask[:, :, 0] = 0  # Blue channel
     colored_mask[:, :, 1] = 0  # Green channel
     # Red channel is kept as is
-    
+    return colored_mask
+
+def postprocess_mask(mask, fmt='png'):
     # Convert to base64 for sending to frontend
-    _, buffer = cv2.imencode('.png', colored_mask)
-    return base64.b64encode(buffer).decode('utf-8')
+    return encode_base64(mask_to_image(mask), fmt)
 
 def interpret_prediction(pred):
     mel_prob = pred[0]
@@ -53,37 +88,48 @@ def register_predicttwo_route(app):
         if 'image' not in request.files:
             return jsonify({'error': 'Image is required'}), 400
         
+        try:
+            fmt = parse_format(request.args.get('format'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         try:
             # Get image file
             file = request.files['image']
             
             # Read image
             img_bytes = file.read()
-            img = cv2.imdecode(np.frombuffer(img_bytes, np.uint8), cv2.IMREAD_COLOR)
+            img = decode_bgr(img_bytes, min_size=IMG_SIZE)
             
             if img is None:
                 return jsonify({'error': 'Invalid image format'}), 400
             
-            # Process for classification
-            classifier_input = preprocess_for_classifier(img)
-            classification_result = classifier_model.predict(classifier_input)[0]
+            # Classification and segmentation in a single call on the configured backend
+            fused_inference = get_fused_inference()
+            classification_output, segmentation_output = fused_inference(img)
+            classification_result = classification_output[0]
             mel_prob = float(classification_result[0])
             nv_prob = float(classification_result[1])
             
-            # Process for segmentation
-            segmentation_input = preprocess_for_segmentation(img)
-            segmentation_output = segmentation_model.predict(segmentation_input)
-            segmentation_mask = postprocess_mask(segmentation_output)
-            
             # Prepare response
-            return jsonify({
+            response = {
                 'diagnosis': {
                     'Melanoma': mel_prob,
                     'Nevus': nv_prob
                 },
-                'interpretation': interpret_prediction([mel_prob, nv_prob]),
-                'segmentation_mask': segmentation_mask
-            })
+                'interpretation': interpret_prediction([mel_prob, nv_prob])
+            }
+            
+            # Accept: multipart/mixed sends the mask as a raw image part
+            if wants_multipart(request):
+                mask_image = mask_to_image(segmentation_output)
+                return multipart_response(response, [
+                    ('segmentation_mask', fmt, lambda: encode_image(mask_image, fmt))
+                ])
+            
+            # Process for segmentation
+            response['segmentation_mask'] = postprocess_mask(segmentation_output, fmt)
+            return jsonify(response)
         
         except Exception as e:
             app.logger.error(f"Prediction error: {str(e)}")
@@ -0,0 +1,25 @@
+import numpy as np
+
+from image_encoding import encode_image
+from preprocessing import PreparedImage
+
+from .inference import get_inference_model
+from .model_registry import CLASSIFIER_MODEL_PATH, SEGMENTATION_MODEL_PATH
+from .routes.predict import SegmentationResult
+from .routes.predicttwo import get_fused_inference
+
+
+def warm_up_steps():
+    """Warm-up steps covering every model and rendering path the routes use."""
+    # Noise rather than zeros so thresholding and contour search do real work
+    image = np.random.default_rng(0).integers(0, 256, (300, 300, 3), dtype=np.uint8)
+
+    def segmentation_overlay():
+        encode_image(SegmentationResult(PreparedImage(image)).heatmap_overlay, 'png')
+
+    return {
+        'classifier': lambda: get_inference_model(CLASSIFIER_MODEL_PATH).warm_up(),
+        'segmentation_model': lambda: get_inference_model(SEGMENTATION_MODEL_PATH).warm_up(),
+        'predict_segmentation': segmentation_overlay,
+        'predicttwo_fused': lambda: get_fused_inference()(image),
+    }
@@ -0,0 +1,71 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+class BatchingEngine:
+    """Coalesce single-image TFLite requests into dynamic batches.
+
+    Callers push a (1, H, W, C) array with `predict()` and block until their
+    row of the batched output comes back. Background workers drain the
+    queue, waiting at most `max_wait_ms` for up to `max_batch_size` requests,
+    and run each batch on an interpreter checked out of an `InterpreterPool`.
+    """
+
+    def __init__(self, pool, max_batch_size=8, max_wait_ms=5.0, workers=None):
+        self.pool = pool
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        # One dispatcher per pooled interpreter keeps every interpreter busy
+        self._queue = queue.Queue()
+        self._workers = [
+            threading.Thread(target=self._run, name=f"tflite-batcher-{i}", daemon=True)
+            for i in range(workers or pool.size)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, img_array):
+        """Queue a single image and return a Future resolving to its output row."""
+        future = Future()
+        self._queue.put((img_array, future))
+        return future
+
+    def predict(self, img_array):
+        return self.submit(img_array).result()
+
+    def _collect(self):
+        # Block for the first request, then give others a short window to join
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            batch = [(img, future) for img, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            futures = [future for _, future in batch]
+
+            try:
+                outputs = self.pool.run(np.concatenate([img for img, _ in batch], axis=0))
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for i, future in enumerate(futures):
+                future.set_result(outputs[i])
@@ -0,0 +1,66 @@
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import preprocessing
+from preprocessing import decode_bgr, open_image
+
+# Compare full-resolution decoding against reduced JPEG decoding (PIL draft / IMREAD_REDUCED_*)
+# Usage: python bench_decode.py [image.jpg ...]  (a synthetic 16 MP JPEG if none given)
+
+
+def load_uploads(paths):
+    if paths:
+        for path in paths:
+            with open(path, "rb") as f:
+                yield path, f.read()
+        return
+
+    # Smooth content so the JPEG looks more like a photo than noise
+    rng = np.random.default_rng(0)
+    small = rng.integers(0, 255, (46, 61, 3), dtype=np.uint8)
+    img = cv2.GaussianBlur(cv2.resize(small, (4896, 3264), interpolation=cv2.INTER_CUBIC), (5, 5), 0)
+    ok, buffer = cv2.imencode(".jpg", img, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    yield "synthetic-16mp.jpg", buffer.tobytes()
+
+
+def measure(fn, *args, repeat=5):
+    result = fn(*args)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(*args)
+    return result, (time.perf_counter() - start) * 1000 / repeat
+
+
+# Each returns the decoded size (the peak buffer) and the 224x224 view
+def pil_224(data):
+    image = open_image(data, (224, 224))
+    return image.size, np.asarray(image.convert("RGB").resize((224, 224)))
+
+
+def cv2_224(data):
+    image = decode_bgr(data, (224, 224))
+    return (image.shape[1], image.shape[0]), cv2.resize(image, (224, 224))
+
+
+def main(paths):
+    for name, data in load_uploads(paths):
+        print(name)
+        for label, fn in (("PIL", pil_224), ("OpenCV", cv2_224)):
+            preprocessing.REDUCED_DECODE = False
+            (full_size, full), full_ms = measure(fn, data)
+            preprocessing.REDUCED_DECODE = True
+            (reduced_size, reduced), reduced_ms = measure(fn, data)
+
+            diff = np.abs(full.astype(np.int16) - reduced.astype(np.int16))
+            print(
+                f"  {label}: full {full_ms:.1f} ms at {full_size[0]}x{full_size[1]}, "
+                f"reduced {reduced_ms:.1f} ms at {reduced_size[0]}x{reduced_size[1]}, "
+                f"224x224 mean abs diff {diff.mean():.2f} (max {diff.max()})"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,40 @@
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from app.inference import CompiledModel
+
+# Per-call latency of Keras model.predict() vs the traced direct-call path
+# Usage: python bench_inference.py [model.h5 ...]  (defaults to best_model_mel_nv.h5)
+
+ITERATIONS = 50
+
+
+def time_calls(fn, x, iterations=ITERATIONS):
+    fn(x)  # first call builds/traces, keep it out of the numbers
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn(x)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.median(timings), np.percentile(timings, 95)
+
+
+def main(paths):
+    for path in paths:
+        model = tf.keras.models.load_model(path)
+        compiled = CompiledModel(model)
+        x = np.random.rand(1, *compiled.input_shape).astype(np.float32)
+
+        print(f"\n{path} (input {compiled.input_shape}, {ITERATIONS} calls)")
+        before = time_calls(lambda batch: model.predict(batch, verbose=0), x)
+        after = time_calls(compiled, x)
+        print(f"  model.predict():  median {before[0]:.2f} ms, p95 {before[1]:.2f} ms")
+        print(f"  CompiledModel:    median {after[0]:.2f} ms, p95 {after[1]:.2f} ms")
+        print(f"  speedup:          {before[0] / after[0]:.1f}x")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:] or ['best_model_mel_nv.h5'])
@@ -0,0 +1,88 @@
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+
+import model
+
+# Images/sec of the training input pipelines in model.py: the legacy
+# ImageDataGenerator against tf.data, with and without an in-memory cache,
+# and tf.data over pre-resized memory-mapped shards.
+# Usage: python bench_input_pipeline.py [image_dir]  (synthetic ISIC-sized JPEGs if none given)
+
+BATCHES = 20
+
+
+def synthetic_dataframe(directory, count=512):
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(count):
+        small = rng.integers(0, 255, (24, 32, 3), dtype=np.uint8)
+        image = cv2.resize(small, (1024, 768), interpolation=cv2.INTER_CUBIC)
+        path = os.path.join(directory, f"synthetic_{i}.jpg")
+        cv2.imwrite(path, image)
+        rows.append({"filepath": path, "label": model.CLASS_NAMES[i % 2]})
+    return pd.DataFrame(rows)
+
+
+def image_dataframe(directory):
+    paths = sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    )
+    return pd.DataFrame({"filepath": paths, "label": [model.CLASS_NAMES[i % 2] for i in range(len(paths))]})
+
+
+def images_per_second(batches, count, warmup=1):
+    iterator = iter(batches)
+    # Exclude start-up (thread pools, tracing, filling a cache)
+    for _ in range(warmup):
+        next(iterator)
+    start = time.perf_counter()
+    images = 0
+    for _ in range(count):
+        try:
+            x, _ = next(iterator)
+        except StopIteration:
+            break
+        images += len(x)
+    return images / (time.perf_counter() - start)
+
+
+def repeat(dataset_fn):
+    # Cached datasets only pay off from the second epoch, so time a repeated stream
+    return dataset_fn().repeat()
+
+
+def main(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        df = image_dataframe(args[0]) if args else synthetic_dataframe(tmp)
+        print(f"{len(df)} images, batch size {model.CONFIG['BATCH_SIZE']}, {BATCHES} batches each")
+
+        train_gen, _ = model.create_generators(df, df)
+        print(f"  ImageDataGenerator:      {images_per_second(train_gen, BATCHES):8.1f} images/sec")
+
+        model.CONFIG["DATA_CACHE"] = None
+        train_ds = repeat(lambda: model.make_dataset(df, training=True))
+        print(f"  tf.data:                 {images_per_second(train_ds, BATCHES):8.1f} images/sec")
+
+        model.CONFIG["DATA_CACHE"] = ""
+        train_ds = repeat(lambda: model.make_dataset(df, training=True))
+        # One full pass fills the cache before timing starts
+        epoch = -(-len(df) // model.CONFIG["BATCH_SIZE"])
+        print(f"  tf.data (memory cache):  {images_per_second(train_ds, BATCHES, warmup=epoch):8.1f} images/sec")
+
+        model.CONFIG["SHARD_DIR"] = os.path.join(tmp, "shards")
+        start = time.perf_counter()
+        shards = model.ensure_shards(df, "train")
+        print(f"  shard build (one-time):  {len(df) / (time.perf_counter() - start):8.1f} images/sec")
+        train_ds = repeat(lambda: model.make_shard_dataset(shards, training=True))
+        print(f"  tf.data (shards):        {images_per_second(train_ds, BATCHES):8.1f} images/sec")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
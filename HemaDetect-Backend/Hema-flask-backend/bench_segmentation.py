@@ -0,0 +1,52 @@
+import sys
+import time
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from pipeline import segmentation_mask
+from segmentation import MASK_AGREEMENT_TOLERANCE, cluster_channel
+
+# Compare the fast histogram k-means against the original sklearn KMeans fit
+# Usage: python bench_segmentation.py [image ...]  (synthetic images if none given)
+
+
+def load_a_channels(paths):
+    if paths:
+        for path in paths:
+            img = np.array(Image.open(path).resize((224, 224)).convert("RGB"))
+            yield path, cv2.cvtColor(img, cv2.COLOR_RGB2LAB)[:, :, 1]
+        return
+
+    rng = np.random.default_rng(0)
+    for i in range(10):
+        img = rng.integers(0, 255, (28, 28, 3), dtype=np.uint8)
+        img = cv2.GaussianBlur(cv2.resize(img, (224, 224), interpolation=cv2.INTER_CUBIC), (7, 7), 0)
+        yield f"synthetic-{i}", cv2.cvtColor(img, cv2.COLOR_RGB2LAB)[:, :, 1]
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(paths):
+    worst = 1.0
+    for name, a in load_a_channels(paths):
+        _, fast_ms = timed(cluster_channel, a, mode="fast")
+        _, exact_ms = timed(cluster_channel, a, mode="exact")
+
+        # Compare the final masks segment_image() applies, after morphology
+        agreement = float((segmentation_mask(a, mode="fast") == segmentation_mask(a, mode="exact")).mean())
+        worst = min(worst, agreement)
+        print(f"{name}: fast {fast_ms:.2f} ms, exact {exact_ms:.1f} ms, mask agreement {agreement:.4f}")
+
+    status = "OK" if worst >= MASK_AGREEMENT_TOLERANCE else "BELOW TOLERANCE"
+    print(f"\nWorst agreement {worst:.4f} (tolerance {MASK_AGREEMENT_TOLERANCE}): {status}")
+    return worst >= MASK_AGREEMENT_TOLERANCE
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
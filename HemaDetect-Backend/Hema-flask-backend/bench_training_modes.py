@@ -0,0 +1,106 @@
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+import pandas as pd
+import tensorflow as tf
+
+import model
+
+# Step time and final training/validation accuracy of each model.py TRAINING_MODE,
+# fine-tuning the whole network as main()'s second stage does.
+# Usage: python bench_training_modes.py [image_dir] [img_size] [batch_size]
+#   image_dir holds melanoma/ and nevus/ subfolders; without it a synthetic,
+#   learnable set is generated and the backbone starts from random weights.
+# "-" as image_dir keeps the synthetic set while setting the other arguments.
+
+EPOCHS = 3
+
+
+def synthetic_dataframe(directory, count=256):
+    # Melanoma images are darker, so accuracy moves within a few epochs
+    rng = np.random.default_rng(0)
+    rows = []
+    for i in range(count):
+        label = model.CLASS_NAMES[i % 2]
+        small = rng.integers(0, 160, (24, 32, 3), dtype=np.uint8) + (0 if label == "melanoma" else 80)
+        image = cv2.resize(small.astype(np.uint8), (600, 450), interpolation=cv2.INTER_CUBIC)
+        path = os.path.join(directory, f"synthetic_{i}.jpg")
+        cv2.imwrite(path, image)
+        rows.append({"filepath": path, "label": label})
+    return pd.DataFrame(rows)
+
+
+def image_dataframe(directory):
+    rows = [
+        {"filepath": os.path.join(directory, label, name), "label": label}
+        for label in model.CLASS_NAMES
+        for name in sorted(os.listdir(os.path.join(directory, label)))
+        if name.lower().endswith((".jpg", ".jpeg", ".png"))
+    ]
+    return pd.DataFrame(rows)
+
+
+class EpochTimer(tf.keras.callbacks.Callback):
+    def on_epoch_begin(self, epoch, logs=None):
+        self.start = time.perf_counter()
+
+    def on_epoch_end(self, epoch, logs=None):
+        self.times.append(time.perf_counter() - self.start)
+
+    def on_train_begin(self, logs=None):
+        self.times = []
+
+
+def run_mode(mode, train_df, val_df, learning_rate):
+    model.CONFIG["TRAINING_MODE"] = mode
+    tf.keras.backend.clear_session()
+    tf.keras.utils.set_random_seed(model.CONFIG["RANDOM_STATE"])
+
+    net = model.build_model(freeze_all=False)
+    model.compile_model(net, learning_rate=learning_rate)
+    timer = EpochTimer()
+    history = net.fit(
+        model.make_dataset(train_df, training=True),
+        validation_data=model.make_dataset(val_df, training=False),
+        epochs=EPOCHS,
+        callbacks=[timer],
+        verbose=0
+    )
+    steps = -(-len(train_df) // model.CONFIG["BATCH_SIZE"])
+    # The first epoch includes tracing and XLA compilation
+    step_ms = min(timer.times[1:] or timer.times) / steps * 1000
+    return step_ms, timer.times[0], history.history["accuracy"][-1], history.history["val_accuracy"][-1]
+
+
+def main(args):
+    if len(args) > 1:
+        size = int(args[1])
+        model.CONFIG["IMG_SIZE"] = (size, size)
+    if len(args) > 2:
+        model.CONFIG["BATCH_SIZE"] = int(args[2])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args and args[0] != "-":
+            df = image_dataframe(args[0])
+            learning_rate = 1e-5
+        else:
+            df = synthetic_dataframe(tmp)
+            # A random backbone needs a first-stage learning rate to learn in a few epochs
+            model.CONFIG["BACKBONE_WEIGHTS"] = None
+            learning_rate = 0.01
+        train_df, val_df = model.split_data(df)
+
+        print(f"{len(train_df)}/{len(val_df)} images at {model.CONFIG['IMG_SIZE']}, "
+              f"batch size {model.CONFIG['BATCH_SIZE']}, {EPOCHS} epochs each")
+        for mode in model.TRAINING_MODES:
+            step_ms, first_epoch, accuracy, val_accuracy = run_mode(mode, train_df, val_df, learning_rate)
+            print(f"  {mode:<20} {step_ms:8.1f} ms/step   first epoch {first_epoch:6.1f} s   "
+                  f"accuracy {accuracy:.3f}   val accuracy {val_accuracy:.3f}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
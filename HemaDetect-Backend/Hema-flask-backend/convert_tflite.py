@@ -0,0 +1,195 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from interpreter_pool import TFLITE_VARIANTS, InterpreterPool, variant_path
+from preprocessing import PreparedImage, decode_bgr
+
+# Convert a Keras .h5 model into float, dynamic-range, float16 and full-INT8
+# TFLite variants, and only keep the ones that match the float model on
+# held-out images.
+#
+# Usage: python convert_tflite.py Model/model4.h5 --data path/to/images
+#   [--variants dynamic,float16,int8] [--preprocess rgb|bgr]
+#   [--classes EarlyPreB,PreB,ProB,Benign]
+#
+# --data is a folder of images, optionally one subfolder per class. The
+# subfolder names give accuracy labels. A fixed sample calibrates INT8,
+# and the remaining images are the held-out evaluation set.
+#
+# Variants are written next to the model as <name>.<variant>.tflite; the
+# float variant is <name>.tflite. aaa.py and the app routes pick one with
+# TFLITE_VARIANT.
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Convert a Keras model to quantized TFLite variants.")
+    parser.add_argument("model", help="Keras .h5 model to convert")
+    parser.add_argument("--data", required=True, help="image folder (class subfolders give labels)")
+    parser.add_argument("--variants", default=",".join(TFLITE_VARIANTS), help="comma-separated subset of %(default)s")
+    parser.add_argument("--output-dir", help="where to write the .tflite files (default: next to the model)")
+    parser.add_argument("--preprocess", choices=("rgb", "bgr"), default="rgb",
+                        help="rgb: PIL RGB / 255 like aaa.py; bgr: OpenCV BGR / 255 like app/routes/predict.py")
+    parser.add_argument("--classes", help="class names in model output order (default: sorted subfolder names)")
+    parser.add_argument("--calibration", type=int, default=100, help="images used as the INT8 representative dataset")
+    parser.add_argument("--max-eval", type=int, default=1000, help="cap on held-out images")
+    parser.add_argument("--min-agreement", type=float, default=0.98,
+                        help="minimum top-1 (or mask pixel) agreement with the float model")
+    parser.add_argument("--max-accuracy-drop", type=float, default=0.01, help="maximum accuracy loss vs the float model")
+    parser.add_argument("--force", action="store_true", help="keep variants that fail the gate")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+# ========== Data ==========
+
+def find_images(data_dir):
+    """Return (path, class name or None) for every image under `data_dir`."""
+    images = []
+    for root, _, files in os.walk(data_dir):
+        label = os.path.relpath(root, data_dir)
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                images.append((os.path.join(root, name), None if label == "." else label.split(os.sep)[0]))
+    return sorted(images)
+
+
+def load_input(path, size, preprocess):
+    with open(path, "rb") as f:
+        data = f.read()
+    if preprocess == "rgb":
+        return PreparedImage.from_bytes(data, size).normalized(size)[0]
+    # Same decode and scaling as the melanoma /predict route
+    return PreparedImage(decode_bgr(data, size)).bgr(size).astype(np.float32) / 255.0
+
+
+def load_dataset(args, input_shape):
+    images = find_images(args.data)
+    if len(images) <= args.calibration:
+        raise SystemExit(f"Need more than {args.calibration} images in {args.data}, found {len(images)}")
+
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(images))
+    calibration = [images[i] for i in order[:args.calibration]]
+    held_out = [images[i] for i in order[args.calibration:args.calibration + args.max_eval]]
+
+    size = (input_shape[1], input_shape[0])
+    calibration_x = np.stack([load_input(path, size, args.preprocess) for path, _ in calibration])
+    eval_x = np.stack([load_input(path, size, args.preprocess) for path, _ in held_out])
+
+    labels = None
+    if all(label is not None for _, label in held_out):
+        classes = args.classes.split(",") if args.classes else sorted({label for _, label in images if label})
+        unknown = {label for _, label in held_out} - set(classes)
+        if unknown:
+            raise SystemExit(f"Subfolders not in --classes: {', '.join(sorted(unknown))}")
+        labels = np.array([classes.index(label) for _, label in held_out])
+    return calibration_x, eval_x, labels
+
+
+# ========== Conversion ==========
+
+def convert(model, variant, calibration_x):
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if variant == "dynamic":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    elif variant == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif variant == "int8":
+        # Integer-only kernels inside; inputs and outputs stay float32 so
+        # InterpreterPool callers don't change
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+
+        def representative_dataset():
+            for sample in calibration_x:
+                yield [sample[np.newaxis]]
+        converter.representative_dataset = representative_dataset
+    return converter.convert()
+
+
+def predict_keras(model, x, batch_size=32):
+    return np.concatenate([model(x[i:i + batch_size], training=False).numpy() for i in range(0, len(x), batch_size)])
+
+
+def predict_tflite(path, x, batch_size=32):
+    pool = InterpreterPool(path, size=1, num_threads=os.cpu_count())
+    start = time.perf_counter()
+    outputs = np.concatenate([pool.run(x[i:i + batch_size]) for i in range(0, len(x), batch_size)])
+    return outputs, (time.perf_counter() - start) * 1000 / len(x)
+
+
+def compare(reference, outputs, labels):
+    """Agreement with the float model, plus accuracy for classifiers with labels."""
+    report = {"max_abs_diff": float(np.abs(reference - outputs).max())}
+    if reference.ndim == 2:
+        report["agreement"] = float((reference.argmax(axis=1) == outputs.argmax(axis=1)).mean())
+        if labels is not None:
+            report["accuracy"] = float((outputs.argmax(axis=1) == labels).mean())
+    else:
+        # Segmentation masks: share of pixels on the same side of 0.5
+        report["agreement"] = float(((reference > 0.5) == (outputs > 0.5)).mean())
+    return report
+
+
+def main(argv):
+    args = parse_args(argv)
+    variants = [v.strip() for v in args.variants.split(",") if v.strip()]
+    unknown = [v for v in variants if v not in TFLITE_VARIANTS]
+    if unknown:
+        raise SystemExit(f"Unknown variant(s): {', '.join(unknown)}")
+
+    print(f"📦 Loading {args.model}")
+    model = tf.keras.models.load_model(args.model, compile=False)
+    input_shape = tuple(model.inputs[0].shape[1:])
+    calibration_x, eval_x, labels = load_dataset(args, input_shape)
+    print(f"📊 {len(calibration_x)} calibration / {len(eval_x)} held-out images")
+
+    reference = predict_keras(model, eval_x)
+    baseline = compare(reference, reference, labels)
+    if "accuracy" in baseline:
+        print(f"   Keras float accuracy: {baseline['accuracy']:.4f}")
+
+    output_dir = args.output_dir or os.path.dirname(os.path.abspath(args.model))
+    os.makedirs(output_dir, exist_ok=True)
+    base_path = os.path.join(output_dir, os.path.splitext(os.path.basename(args.model))[0] + ".tflite")
+
+    failed = []
+    for variant in variants:
+        path = variant_path(base_path, variant)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(convert(model, variant, calibration_x))
+
+        outputs, ms = predict_tflite(tmp_path, eval_x)
+        report = compare(reference, outputs, labels)
+        passed = report["agreement"] >= args.min_agreement
+        if "accuracy" in report:
+            passed = passed and baseline["accuracy"] - report["accuracy"] <= args.max_accuracy_drop
+
+        line = (f"{variant:>8}: {os.path.getsize(tmp_path) / 1e6:6.2f} MB, {ms:6.2f} ms/image, "
+                f"agreement {report['agreement']:.4f}, max |diff| {report['max_abs_diff']:.4f}")
+        if "accuracy" in report:
+            line += f", accuracy {report['accuracy']:.4f}"
+
+        if passed or args.force:
+            os.replace(tmp_path, path)
+            print(f"✅ {line} -> {path}")
+        else:
+            os.remove(tmp_path)
+            print(f"❌ {line} (below gate, not written)")
+        if not passed:
+            failed.append(variant)
+
+    return not failed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main(sys.argv[1:]) else 1)
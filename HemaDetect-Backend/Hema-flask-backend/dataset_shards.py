@@ -0,0 +1,117 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from preprocessing import decode_bgr
+
+# Pre-resized training images stored as uint8 .npy shards that are opened
+# with mmap_mode="r", so epochs after the first stream from the page cache
+# instead of decoding JPEGs again.
+#
+# Layout of a shard directory:
+#   shard_00000.npy ...  (count, height, width, 3) uint8 RGB
+#   labels.npy           one float32 label per image, in shard order
+#   index.json           size, shard files and counts, source file paths and
+#                        labels; written last, so it only exists for complete
+#                        builds
+
+INDEX_FILE = "index.json"
+LABELS_FILE = "labels.npy"
+# 1024 images at 224x224 is ~150 MB per shard
+SHARD_SIZE = 1024
+
+
+def load_resized(path, size):
+    """Decode one image at the smallest JPEG scale covering `size` and resize it to RGB uint8."""
+    with open(path, "rb") as f:
+        image = decode_bgr(f.read(), min_size=size)
+    if image is None:
+        raise ValueError(f"Could not read image: {path}")
+    return cv2.cvtColor(cv2.resize(image, size), cv2.COLOR_BGR2RGB)
+
+
+def build_shards(filepaths, labels, directory, size=(224, 224), shard_size=SHARD_SIZE, workers=None):
+    """Decode, resize and write `filepaths` as shards in `directory`; returns the index."""
+    os.makedirs(directory, exist_ok=True)
+    index_path = os.path.join(directory, INDEX_FILE)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+    filepaths = list(filepaths)
+    shards = []
+    # cv2 releases the GIL while decoding and resizing
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count()) as pool:
+        for n, start in enumerate(range(0, len(filepaths), shard_size)):
+            chunk = filepaths[start:start + shard_size]
+            name = f"shard_{n:05d}.npy"
+            array = np.lib.format.open_memmap(
+                os.path.join(directory, name), mode="w+", dtype=np.uint8, shape=(len(chunk), size[1], size[0], 3)
+            )
+            for i, image in enumerate(pool.map(lambda path: load_resized(path, size), chunk)):
+                array[i] = image
+            array.flush()
+            del array
+            shards.append({"file": name, "count": len(chunk)})
+
+    labels = np.asarray(labels, dtype=np.float32)
+    np.save(os.path.join(directory, LABELS_FILE), labels)
+    index = {"size": list(size), "count": len(filepaths), "shards": shards, "filepaths": filepaths,
+             "labels": labels.tolist()}
+    with open(index_path + ".tmp", "w") as f:
+        json.dump(index, f)
+    os.replace(index_path + ".tmp", index_path)
+    return index
+
+
+def read_index(directory):
+    """The index of a complete shard build in `directory`, or None."""
+    try:
+        with open(os.path.join(directory, INDEX_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+class ShardedDataset:
+    """Read-only view over a shard directory, memory-mapped rather than loaded."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.index = read_index(directory)
+        if self.index is None:
+            raise FileNotFoundError(f"No complete shard build in {directory}")
+
+        self.size = tuple(self.index["size"])
+        self.shards = [np.load(os.path.join(directory, shard["file"]), mmap_mode="r") for shard in self.index["shards"]]
+        self.labels = np.load(os.path.join(directory, LABELS_FILE))
+        self.offsets = np.cumsum([0] + [len(shard) for shard in self.shards])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def batches(self, batch_size, rng=None):
+        """Yield (images, labels) batches, shuffled if `rng` is given.
+
+        Shuffling permutes the shard order and the rows within each shard,
+        so a batch touches at most two shards and reads stay local. Each
+        batch is the only copy made; rows within a segment are read in
+        ascending order.
+        """
+        order = rng.permutation(len(self.shards)) if rng is not None else range(len(self.shards))
+        ids = np.concatenate([
+            self.offsets[s] + (rng.permutation(len(self.shards[s])) if rng is not None else np.arange(len(self.shards[s])))
+            for s in order
+        ])
+
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            shard_of = np.searchsorted(self.offsets, batch, side="right") - 1
+            images, labels = [], []
+            for s in np.unique(shard_of):
+                rows = np.sort(batch[shard_of == s] - self.offsets[s])
+                images.append(self.shards[s][rows])
+                labels.append(self.labels[self.offsets[s] + rows])
+            yield np.concatenate(images), np.concatenate(labels)
@@ -0,0 +1,220 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import tensorflow as tf
+
+# Number of (model, layer) gradient models kept alive at once
+CACHE_SIZE = 4
+# Image/class pairs pushed through one batched Grad-CAM++ graph call
+MAX_ROWS = 32
+
+_engines = OrderedDict()
+_engines_lock = threading.Lock()
+
+
+class GradCamPlusPlus:
+    """Grad-CAM++ for one (model, conv layer) pair.
+
+    The gradient model is built once and the forward pass, first- and
+    second-order gradients and the CAM reduction are traced into a single
+    `tf.function` with a fixed input signature, so requests only execute
+    the graph.
+    """
+
+    def __init__(self, model, last_conv_layer_name="out_relu"):
+        self.model = model
+        self.last_conv_layer_name = last_conv_layer_name
+        self.gradients_missing = False
+        self.grad_model = tf.keras.models.Model(
+            model.inputs,
+            [model.get_layer(last_conv_layer_name).output, model.output]
+        )
+        input_shape = tuple(model.inputs[0].shape[1:])
+        self._compute = tf.function(
+            self._compute_cam,
+            input_signature=[tf.TensorSpec((None, *input_shape), tf.float32)]
+        )
+        self._compute_classes = tf.function(
+            self._compute_class_cams,
+            input_signature=[
+                tf.TensorSpec((None, *input_shape), tf.float32),
+                tf.TensorSpec((None,), tf.int32)
+            ]
+        )
+
+    def _compute_cam(self, img_array):
+        with tf.GradientTape() as tape1:
+            with tf.GradientTape() as tape2:
+                # Get model outputs
+                conv_output, predictions = self.grad_model(img_array, training=False)
+
+                # Handle case where predictions is a list
+                if isinstance(predictions, (list, tuple)):
+                    predictions = tf.convert_to_tensor(predictions)
+
+                # Reshape predictions if needed
+                if len(predictions.shape) == 3 and predictions.shape[1] == 1:
+                    predictions = tf.squeeze(predictions, axis=1)
+
+                # Score of the class predicted for the first image
+                pred_index = tf.argmax(predictions[0])
+                class_channel = tf.gather(predictions, pred_index, axis=1)
+
+            first_grad = tape2.gradient(class_channel, conv_output)
+        second_grad = tape1.gradient(first_grad, conv_output)
+        return self._weighted_cam(conv_output, first_grad, second_grad)
+
+    def _weighted_cam(self, conv_output, first_grad, second_grad):
+        # Missing gradients are a property of the graph, so record it at trace time
+        if first_grad is None or second_grad is None:
+            self.gradients_missing = True
+            return tf.zeros(tf.shape(conv_output)[:3])
+
+        alpha_num = tf.square(first_grad)
+        alpha_denom = (2 * tf.square(first_grad)) + (second_grad * conv_output)
+        alpha_denom = tf.where(alpha_denom != 0.0, alpha_denom, tf.ones_like(alpha_denom))
+        alphas = alpha_num / alpha_denom
+
+        weights = tf.reduce_sum(alphas * tf.nn.relu(second_grad), axis=(1, 2))
+        cam = tf.reduce_sum(tf.multiply(weights[:, tf.newaxis, tf.newaxis, :], conv_output), axis=-1)
+        return tf.nn.relu(cam)
+
+    def _compute_class_cams(self, img_array, class_indices):
+        # Repeat every image once per class so a single pair of tape passes
+        # covers all N x C maps. Rows never interact in inference mode, so the
+        # gradient of the summed scores is each row's own gradient.
+        n = tf.shape(img_array)[0]
+        c = tf.shape(class_indices)[0]
+        images = tf.repeat(img_array, c, axis=0)
+        classes = tf.tile(class_indices, [n])
+
+        with tf.GradientTape() as tape1:
+            with tf.GradientTape() as tape2:
+                conv_output, predictions = self.grad_model(images, training=False)
+
+                if isinstance(predictions, (list, tuple)):
+                    predictions = tf.convert_to_tensor(predictions)
+                if len(predictions.shape) == 3 and predictions.shape[1] == 1:
+                    predictions = tf.squeeze(predictions, axis=1)
+
+                # Row i scores class classes[i]
+                class_channel = tf.gather(predictions, classes, axis=1, batch_dims=1)
+
+            first_grad = tape2.gradient(class_channel, conv_output)
+        second_grad = tape1.gradient(first_grad, conv_output)
+
+        cams = self._weighted_cam(conv_output, first_grad, second_grad)
+        return tf.reshape(cams, tf.concat([[n, c], tf.shape(cams)[1:]], axis=0))
+
+    def cam(self, img_array):
+        """Return the raw (N, h, w) Grad-CAM++ maps at the conv layer resolution."""
+        return self._compute(tf.convert_to_tensor(img_array, tf.float32)).numpy()
+
+    def class_cams(self, img_array, class_indices, max_rows=MAX_ROWS):
+        """Return raw (N, C, h, w) maps of every image for every class in `class_indices`.
+
+        Images are processed in chunks of at most `max_rows` image/class
+        pairs per graph call to bound peak memory.
+        """
+        img_array = np.asarray(img_array, np.float32)
+        class_indices = tf.convert_to_tensor(np.asarray(class_indices, np.int32).reshape(-1))
+        step = max(1, max_rows // max(1, int(class_indices.shape[0])))
+
+        chunks = [
+            self._compute_classes(tf.convert_to_tensor(img_array[start:start + step]), class_indices).numpy()
+            for start in range(0, len(img_array), step)
+        ]
+        return np.concatenate(chunks)
+
+
+def get_engine(model, last_conv_layer_name="out_relu"):
+    """Return the cached Grad-CAM++ engine for a model/layer, building it once."""
+    key = (id(model), last_conv_layer_name)
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is not None:
+            _engines.move_to_end(key)
+            return engine
+
+        # The engine keeps a reference to `model`, so its id stays valid while cached
+        engine = GradCamPlusPlus(model, last_conv_layer_name)
+        _engines[key] = engine
+        if len(_engines) > CACHE_SIZE:
+            _engines.popitem(last=False)
+        return engine
+
+
+def cam_intensity(cam, size=(224, 224)):
+    """Normalize a raw CAM map and resize it to a uint8 intensity map."""
+    # Handle division by zero
+    cam_max = cam.max()
+    if cam_max > 0:
+        cam = cam / cam_max
+
+    cam = cv2.resize(cam, size)
+    return np.uint8(255 * cam)
+
+
+def colorize_cam(cam, size=(224, 224)):
+    """Normalize a raw CAM map, resize it and apply the JET colormap."""
+    return cv2.applyColorMap(cam_intensity(cam, size), cv2.COLORMAP_JET)
+
+
+def grad_cam_plus(model, img_array, last_conv_layer_name="out_relu"):
+    try:
+        engine = get_engine(model, last_conv_layer_name)
+        cam = engine.cam(img_array)[0]
+
+        # Handle None gradients
+        if engine.gradients_missing:
+            # Return a default heatmap if gradients are None
+            return np.zeros((224, 224, 3), dtype=np.uint8)
+
+        return colorize_cam(cam)
+
+    except Exception as e:
+        print(f"Error in grad_cam_plus: {e}")
+        # Return a default heatmap on error
+        return np.zeros((224, 224, 3), dtype=np.uint8)
+
+
+def grad_cam_plus_intensity(model, img_array, last_conv_layer_name="out_relu"):
+    """Uncolored (224, 224) uint8 Grad-CAM++ map, or None if it can't be computed.
+
+    Lets the renderer apply its own colormap without a JET pass here first.
+    """
+    try:
+        engine = get_engine(model, last_conv_layer_name)
+        cam = engine.cam(img_array)[0]
+        if engine.gradients_missing:
+            return None
+        return cam_intensity(cam)
+
+    except Exception as e:
+        print(f"Error in grad_cam_plus: {e}")
+        return None
+
+
+def grad_cam_plus_batch(model, img_array, class_indices=None, last_conv_layer_name="out_relu"):
+    """Grad-CAM++ heatmaps for N images x C classes in batched gradient passes.
+
+    `class_indices` defaults to every output class. Returns a uint8 array of
+    shape (N, C, 224, 224, 3), where [i, j] is the JET heatmap of image i
+    for class `class_indices[j]`, normalized per map like `grad_cam_plus()`.
+    """
+    engine = get_engine(model, last_conv_layer_name)
+    if class_indices is None:
+        class_indices = range(model.output.shape[-1])
+    class_indices = list(class_indices)
+
+    cams = engine.class_cams(img_array, class_indices)
+    heatmaps = np.zeros((*cams.shape[:2], 224, 224, 3), dtype=np.uint8)
+    if engine.gradients_missing:
+        return heatmaps
+
+    for i in range(cams.shape[0]):
+        for j in range(cams.shape[1]):
+            heatmaps[i, j] = colorize_cam(cams[i, j])
+    return heatmaps
@@ -0,0 +1,82 @@
+import base64
+import json
+import os
+import uuid
+
+import cv2
+from flask import Response
+
+# PNG zlib level (0-9); lower is faster to encode, higher is smaller.
+# Unset keeps OpenCV's default.
+PNG_COMPRESSION = os.environ.get("PNG_COMPRESSION")
+# WebP quality (1-100, above 100 is lossless)
+WEBP_QUALITY = int(os.environ.get("WEBP_QUALITY", 90))
+
+IMAGE_MIMETYPES = {
+    "png": "image/png",
+    "webp": "image/webp",
+}
+
+
+def parse_format(value):
+    fmt = (value or "png").lower()
+    if fmt not in IMAGE_MIMETYPES:
+        raise ValueError(f"Unsupported image format: {fmt}")
+    return fmt
+
+
+def encode_image(image_bgr, fmt="png"):
+    """Encode a BGR uint8 array straight to PNG or WebP bytes."""
+    if fmt == "png":
+        params = [cv2.IMWRITE_PNG_COMPRESSION, int(PNG_COMPRESSION)] if PNG_COMPRESSION else []
+    elif fmt == "webp":
+        params = [cv2.IMWRITE_WEBP_QUALITY, WEBP_QUALITY]
+    else:
+        raise ValueError(f"Unsupported image format: {fmt}")
+
+    ok, buffer = cv2.imencode(f".{fmt}", image_bgr, params)
+    if not ok:
+        raise ValueError(f"Failed to encode image as {fmt}")
+    return buffer.tobytes()
+
+
+def encode_base64(image_bgr, fmt="png"):
+    return base64.b64encode(encode_image(image_bgr, fmt)).decode("utf-8")
+
+
+def wants_multipart(request):
+    """True if the client prefers multipart/mixed over JSON in its Accept header."""
+    best = request.accept_mimetypes.best_match(["application/json", "multipart/mixed"])
+    return best == "multipart/mixed"
+
+
+def multipart_response(metadata, parts):
+    """Stream JSON metadata followed by raw image parts as multipart/mixed.
+
+    `parts` is a list of (name, fmt, produce) where `produce()` returns the
+    encoded bytes. Parts are produced one at a time while streaming, so the
+    whole response is never held in memory at once.
+    """
+    boundary = uuid.uuid4().hex
+
+    def generate():
+        yield (
+            f"--{boundary}\r\n"
+            "Content-Type: application/json\r\n"
+            'Content-Disposition: inline; name="metadata"\r\n\r\n'
+        ).encode("utf-8")
+        yield json.dumps(metadata).encode("utf-8")
+
+        for name, fmt, produce in parts:
+            data = produce()
+            yield (
+                f"\r\n--{boundary}\r\n"
+                f"Content-Type: {IMAGE_MIMETYPES[fmt]}\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f'Content-Disposition: inline; name="{name}"; filename="{name}.{fmt}"\r\n\r\n'
+            ).encode("utf-8")
+            yield data
+
+        yield f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+    return Response(generate(), mimetype=f"multipart/mixed; boundary={boundary}")
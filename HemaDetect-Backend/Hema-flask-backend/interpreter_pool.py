@@ -0,0 +1,108 @@
+import os
+import queue
+from contextlib import contextmanager
+
+import numpy as np
+
+# Prefer the standalone TFLite runtime, which loads without the TensorFlow graph runtime
+try:
+    from tflite_runtime.interpreter import Interpreter
+except ImportError:
+    Interpreter = None
+
+# Variants written by convert_tflite.py; "float" is the unquantized model
+TFLITE_VARIANTS = ("float", "dynamic", "float16", "int8")
+
+
+def interpreter_class():
+    """`tflite_runtime`'s Interpreter if installed, else `tf.lite.Interpreter`."""
+    if Interpreter is not None:
+        return Interpreter
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+def variant_path(model_path, variant=None):
+    """Path of a variant of `model_path`, e.g. model4.tflite -> model4.int8.tflite."""
+    if not variant or variant == "float":
+        return model_path
+    if variant not in TFLITE_VARIANTS:
+        raise ValueError(f"Unknown TFLite variant: {variant}")
+    stem, ext = os.path.splitext(model_path)
+    return f"{stem}.{variant}{ext}"
+
+
+class InterpreterPool:
+    """A fixed set of pre-allocated TFLite interpreters checked out per request.
+
+    A `tf.lite.Interpreter` is not safe to share across threads, but several
+    interpreters built from the same model file share its memory-mapped
+    weights, so N of them cost little more than one.
+    """
+
+    def __init__(self, model_path, size=None, num_threads=1):
+        self.model_path = model_path
+        self.size = max(1, int(size or os.cpu_count() or 1))
+        self.num_threads = num_threads
+        self._resizable = True
+
+        self._idle = queue.LifoQueue()
+        interpreter_cls = interpreter_class()
+        for _ in range(self.size):
+            interpreter = interpreter_cls(model_path=model_path, num_threads=num_threads)
+            interpreter.allocate_tensors()
+            self._idle.put(interpreter)
+
+        # All interpreters come from the same model, so details are shared
+        with self.checkout() as interpreter:
+            self.input_details = interpreter.get_input_details()
+            self.output_details = interpreter.get_output_details()
+        self._input_index = self.input_details[0]['index']
+        self._output_index = self.output_details[0]['index']
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        """Borrow an interpreter for the duration of a `with` block."""
+        interpreter = self._idle.get(timeout=timeout)
+        try:
+            yield interpreter
+        finally:
+            self._idle.put(interpreter)
+
+    def warm_up(self):
+        """Invoke every interpreter once so none of them is cold on its first request."""
+        interpreters = [self._idle.get() for _ in range(self.size)]
+        try:
+            sample = np.zeros(self.input_details[0]['shape'], dtype=self.input_details[0]['dtype'])
+            for interpreter in interpreters:
+                self._invoke(interpreter, sample)
+        finally:
+            for interpreter in interpreters:
+                self._idle.put(interpreter)
+
+    def run(self, inputs):
+        """Run a (N, H, W, C) batch on a free interpreter and return its (N, ...) output."""
+        inputs = inputs.astype(self.input_details[0]['dtype'], copy=False)
+        with self.checkout() as interpreter:
+            if not self._resizable:
+                return np.concatenate([self._invoke(interpreter, inputs[i:i + 1]) for i in range(len(inputs))])
+
+            if interpreter.get_input_details()[0]['shape'][0] != inputs.shape[0]:
+                try:
+                    interpreter.resize_tensor_input(self._input_index, list(inputs.shape))
+                    interpreter.allocate_tensors()
+                except Exception as e:
+                    # Models converted with a fixed batch dimension cannot be resized;
+                    # fall back to one invoke() per row on the original shape.
+                    print(f"Batch resize unsupported, running unbatched: {e}")
+                    self._resizable = False
+                    interpreter.resize_tensor_input(self._input_index, [1, *inputs.shape[1:]])
+                    interpreter.allocate_tensors()
+                    return np.concatenate([self._invoke(interpreter, inputs[i:i + 1]) for i in range(len(inputs))])
+
+            return self._invoke(interpreter, inputs)
+
+    def _invoke(self, interpreter, inputs):
+        interpreter.set_tensor(self._input_index, inputs)
+        interpreter.invoke()
+        return interpreter.get_tensor(self._output_index)
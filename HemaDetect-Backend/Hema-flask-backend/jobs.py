@@ -0,0 +1,238 @@
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+# Job states as stored in the `status` column
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+class WorkersUnavailable(Exception):
+    pass
+
+
+@contextmanager
+def _connect(db_path):
+    # Autocommit connection; submit() opens its own transaction when it needs one
+    conn = sqlite3.connect(db_path, timeout=30, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        yield conn
+    finally:
+        conn.close()
+
+
+def _set_status(db_path, job_id, status, result=None, error=None):
+    with _connect(db_path) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, updated = ? WHERE id = ?",
+            (status, result, error, time.time(), job_id)
+        )
+
+
+# ---- Worker process side ----
+
+_worker = {}
+
+
+def _init_worker(tflite_path, h5_path):
+    """Load one interpreter and the Grad-CAM++ model per worker process."""
+    import tensorflow as tf
+
+    interpreter = tf.lite.Interpreter(model_path=tflite_path, num_threads=1)
+    interpreter.allocate_tensors()
+    _worker["interpreter"] = interpreter
+    _worker["gradcam_model"] = tf.keras.models.load_model(h5_path)
+
+
+def _run_job(db_path, job_id, data, include, fmt):
+    import base64
+
+    from gradcam import grad_cam_plus_intensity
+    from image_encoding import encode_image
+    from pipeline import classify, generate_overlay, segment_image
+    from preprocessing import PreparedImage
+
+    _set_status(db_path, job_id, RUNNING)
+    try:
+        prepared = PreparedImage.from_bytes(data, min_size=(224, 224))
+        img_array = prepared.normalized()
+
+        interpreter = _worker["interpreter"]
+        interpreter.set_tensor(interpreter.get_input_details()[0]['index'], img_array)
+        interpreter.invoke()
+        predictions = interpreter.get_tensor(interpreter.get_output_details()[0]['index'])[0]
+
+        result = classify(predictions)
+        artifacts = {
+            "gradcam": lambda: generate_overlay(prepared, grad_cam_plus_intensity(_worker["gradcam_model"], img_array)),
+            "segmented": lambda: segment_image(prepared),
+        }
+        for name in include:
+            result[name] = base64.b64encode(encode_image(artifacts[name](), fmt)).decode("utf-8")
+
+        _set_status(db_path, job_id, DONE, result=json.dumps(result))
+    except Exception as e:
+        _set_status(db_path, job_id, FAILED, error=f"Processing failed: {str(e)}")
+
+
+# ---- Web process side ----
+
+class JobQueue:
+    """Bounded background queue for heavy explainability requests.
+
+    Jobs are recorded in a local SQLite database that stands in for a
+    broker, so every gunicorn worker sharing `db_path` sees the same job
+    states and the same backpressure limit. The work itself runs in a pool
+    of worker processes, keeping TensorFlow off the request threads.
+    """
+
+    def __init__(self, db_path, tflite_path, h5_path, workers=2, max_pending=64, ttl=3600):
+        self.db_path = db_path
+        self.tflite_path = tflite_path
+        self.h5_path = h5_path
+        self.workers = max(1, int(workers))
+        self.max_pending = max(1, int(max_pending))
+        self.ttl = ttl
+        self._executor = None
+        self._lock = threading.Lock()
+
+        with _connect(db_path) as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, status TEXT NOT NULL, owner INTEGER NOT NULL, "
+                "result TEXT, error TEXT, created REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+        self._fail_orphans()
+
+    def _get_executor(self):
+        # Started on first use so importing the app doesn't spawn processes
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker,
+                    initargs=(self.tflite_path, self.h5_path)
+                )
+            return self._executor
+
+    def _replace_executor(self, executor):
+        """Drop a broken executor so the next job starts a fresh pool."""
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def _fail_orphans(self):
+        """Fail unfinished jobs whose owning web process no longer exists."""
+        with _connect(self.db_path) as conn:
+            rows = conn.execute(
+                "SELECT id, owner FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchall()
+            for job_id, owner in rows:
+                try:
+                    os.kill(owner, 0)
+                except ProcessLookupError:
+                    conn.execute(
+                        "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                        (FAILED, "Worker restarted before the job finished", time.time(), job_id)
+                    )
+                except PermissionError:
+                    pass
+
+    def submit(self, data, include, fmt="png"):
+        """Queue an image for prediction plus artifacts and return its job ID.
+
+        Raises QueueFull when `max_pending` jobs are already queued or running,
+        and WorkersUnavailable when no worker pool could take the job.
+        """
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with _connect(self.db_path) as conn:
+            # Reserve the slot atomically against other web workers
+            conn.execute("BEGIN IMMEDIATE")
+            pending = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                conn.execute("ROLLBACK")
+                raise QueueFull(f"{pending} jobs pending")
+            conn.execute("DELETE FROM jobs WHERE status IN (?, ?) AND updated < ?", (DONE, FAILED, now - self.ttl))
+            conn.execute(
+                "INSERT INTO jobs (id, status, owner, created, updated) VALUES (?, ?, ?, ?, ?)",
+                (job_id, QUEUED, os.getpid(), now, now)
+            )
+            conn.execute("COMMIT")
+
+        try:
+            self._dispatch(job_id, (data, list(include), fmt))
+        except Exception as e:
+            # Don't leave a QUEUED row holding a max_pending slot
+            _set_status(self.db_path, job_id, FAILED, error=f"Could not start job: {str(e)}")
+            raise WorkersUnavailable(str(e)) from e
+        return job_id
+
+    def _dispatch(self, job_id, args, retries=1):
+        executor = self._get_executor()
+        try:
+            future = executor.submit(_run_job, self.db_path, job_id, *args)
+        except BrokenProcessPool:
+            # A worker died (OOM killer, SIGKILL); replace the whole pool
+            self._replace_executor(executor)
+            if not retries:
+                raise
+            return self._dispatch(job_id, args, retries - 1)
+        future.add_done_callback(lambda f: self._on_done(job_id, args, retries, executor, f))
+
+    def _on_done(self, job_id, args, retries, executor, future):
+        # The worker records its own result; this only catches crashed workers
+        if future.cancelled():
+            error = RuntimeError("Job was cancelled")
+        else:
+            error = future.exception()
+        if isinstance(error, BrokenProcessPool):
+            self._replace_executor(executor)
+            # Jobs that never started didn't crash the pool, so run them again
+            job = self.get(job_id)
+            if retries and job is not None and job["status"] == QUEUED:
+                try:
+                    self._dispatch(job_id, args, retries - 1)
+                    return
+                except Exception as e:
+                    error = e
+        if error is not None:
+            _set_status(self.db_path, job_id, FAILED, error=f"Worker failed: {str(error)}")
+
+    def get(self, job_id):
+        """Return the job as a dict, or None if it is unknown or expired."""
+        with _connect(self.db_path) as conn:
+            row = conn.execute(
+                "SELECT status, result, error, created, updated FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+
+        status, result, error, created, updated = row
+        job = {"job_id": job_id, "status": status, "created": created, "updated": updated}
+        if result is not None:
+            job["result"] = json.loads(result)
+        if error is not None:
+            job["error"] = error
+        return job
+
+    def stats(self):
+        with _connect(self.db_path) as conn:
+            counts = dict(conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {"max_pending": self.max_pending, "workers": self.workers, **counts}
@@ -1,22 +1,32 @@
 # ============================ IMPORTS ============================
 
+import hashlib
+import json
 import os
 import cv2
 import numpy as np
 import pandas as pd
 
-from typing import Tuple
+from typing import Set, Tuple
 
 from sklearn.model_selection import train_test_split
 
+import tensorflow as tf
 from tensorflow.keras.applications import ResNet50
 from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
-from tensorflow.keras.layers import Dense, Dropout, GlobalAveragePooling2D
+from tensorflow.keras.layers import Dense, Dropout, GlobalAveragePooling2D, Input
 from tensorflow.keras.models import Model
 from tensorflow.keras.optimizers import SGD
 from tensorflow.keras.preprocessing.image import ImageDataGenerator
 
-from google.colab import drive
+from dataset_shards import ShardedDataset, build_shards, read_index
+
+# Manifests are Parquet when pyarrow is installed, pickle otherwise
+try:
+    import pyarrow  # noqa: F401
+    MANIFEST_FORMAT = "parquet"
+except ImportError:
+    MANIFEST_FORMAT = "pkl"
 
 
 # =========================== CONFIG =============================
@@ -27,8 +37,52 @@ CONFIG = {
     "BATCH_SIZE": 64,
     "EPOCHS": 10,
     "RANDOM_STATE": 42,
+    # "tf.data" (parallel decode, batched augmentation), "shards" (tf.data over
+    # pre-resized memory-mapped shards) or "generator" (ImageDataGenerator)
+    "INPUT_PIPELINE": "tf.data",
+    # tf.data cache of decoded, resized images: None = off, "" = in memory, else a file path
+    "DATA_CACHE": None,
+    "SHUFFLE_BUFFER": 1024,
+    # Where the "shards" pipeline writes train/ and val/ shards, built once
+    # and rebuilt only when the split changes
+    "SHARD_DIR": "/content/drive/MyDrive/dataset_minor_project/ISIC_2019/shards_224",
+    # Directory for pooled embeddings of the frozen backbone. When set, the
+    # first stage runs the backbone once and trains only the head on these
+    # (unaugmented) features; None trains the first stage end to end.
+    "FEATURE_CACHE": None,
+    # Where load_splits() keeps the merged, filtered and split dataset,
+    # keyed by a fingerprint of the CSVs and image folder; None disables it
+    "MANIFEST_DIR": "/content/drive/MyDrive/dataset_minor_project/ISIC_2019/manifests",
+    # Key of TRAINING_MODES; bench_training_modes.py compares them
+    "TRAINING_MODE": "float32",
+    # ResNet50 starting weights; None for random initialisation
+    "BACKBONE_WEIGHTS": "imagenet",
+}
+
+# Compute precision, XLA and steps per execution used by build_model() and
+# compile_model(). mixed_bfloat16 keeps float32 variables and a float32
+# sigmoid head; "auto" is the Keras default (XLA on GPU only).
+TRAINING_MODES = {
+    "float32": {"policy": "float32", "jit_compile": "auto", "steps_per_execution": 1},
+    "mixed_bfloat16": {"policy": "mixed_bfloat16", "jit_compile": "auto", "steps_per_execution": 1},
+    "float32_xla": {"policy": "float32", "jit_compile": True, "steps_per_execution": 8},
+    "mixed_bfloat16_xla": {"policy": "mixed_bfloat16", "jit_compile": True, "steps_per_execution": 8},
 }
 
+# Same augmentation ranges for both input pipelines
+AUGMENTATION = {
+    "rotation_range": 30,
+    "width_shift_range": 0.2,
+    "height_shift_range": 0.2,
+    "shear_range": 0.2,
+    "zoom_range": 0.2,
+    "horizontal_flip": True,
+    "brightness_range": [0.8, 1.2],
+}
+
+# flow_from_dataframe's class_mode='binary' indexes labels alphabetically
+CLASS_NAMES = ["melanoma", "nevus"]
+
 # Derived paths
 CSV_PATH = os.path.join(CONFIG["BASE_DIR"], "ISIC_2019_Training_GroundTruth.csv")
 IMG_DIR = os.path.join(CONFIG["BASE_DIR"], "ISIC_2019_Training_Input/ISIC_2019_Training_Input")
@@ -49,6 +103,12 @@ def verify_paths():
 
 # ========================== DATASET ==============================
 
+def scan_images(directory: str) -> Set[str]:
+    """Names of the .jpg files in `directory`, from a single directory listing."""
+    with os.scandir(directory) as entries:
+        return {entry.name for entry in entries if entry.name.endswith(".jpg")}
+
+
 def load_and_merge_data() -> pd.DataFrame:
     """Load labels and metadata, filter classes, and add filepaths."""
     print("📄 Reading CSV files...")
@@ -61,9 +121,11 @@ def load_and_merge_data() -> pd.DataFrame:
     print("🔍 Filtering for binary classification (melanoma vs nevus)...")
     df = df[(df['MEL'] == 1.0) | (df['NV'] == 1.0)].copy()
     df['label'] = np.where(df['MEL'] == 1.0, 'melanoma', 'nevus')
-    df['filepath'] = df['image'].apply(lambda x: os.path.join(IMG_DIR, f"{x}.jpg"))
+    filenames = df['image'] + ".jpg"
+    df['filepath'] = os.path.join(IMG_DIR, "") + filenames
 
-    df = df[df['filepath'].apply(os.path.exists)]
+    # One listing of IMG_DIR instead of a stat per row
+    df = df[filenames.isin(scan_images(IMG_DIR))]
     if df.empty:
         raise ValueError("❌ No valid image paths after filtering.")
     
@@ -83,20 +145,55 @@ def split_data(df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.DataFrame]:
     return train_df, val_df
 
 
+def dataset_fingerprint() -> str:
+    """Hash of the label CSVs, the image folder and the split settings, from three stat() calls.
+
+    The folder's mtime changes when images are added or removed; delete
+    the manifest to force a rebuild after replacing files in place.
+    """
+    stats = [os.stat(path) for path in (CSV_PATH, METADATA_PATH, IMG_DIR)]
+    key = {
+        "paths": [CSV_PATH, METADATA_PATH, IMG_DIR],
+        "stats": [[st.st_size, st.st_mtime_ns] for st in stats],
+        "classes": CLASS_NAMES,
+        "random_state": CONFIG["RANDOM_STATE"],
+    }
+    return hashlib.sha1(json.dumps(key, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def load_splits() -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """load_and_merge_data() and split_data(), reusing the manifest for an unchanged dataset."""
+    if not CONFIG["MANIFEST_DIR"]:
+        return split_data(load_and_merge_data())
+
+    path = os.path.join(CONFIG["MANIFEST_DIR"], f"manifest_{dataset_fingerprint()}.{MANIFEST_FORMAT}")
+    if os.path.exists(path):
+        manifest = pd.read_parquet(path) if MANIFEST_FORMAT == "parquet" else pd.read_pickle(path)
+        print(f"✅ Loaded manifest {path}")
+    else:
+        train_df, val_df = split_data(load_and_merge_data())
+        manifest = pd.concat([train_df.assign(split="train"), val_df.assign(split="val")])
+
+        os.makedirs(CONFIG["MANIFEST_DIR"], exist_ok=True)
+        tmp_path = path + ".tmp"
+        if MANIFEST_FORMAT == "parquet":
+            manifest.to_parquet(tmp_path)
+        else:
+            manifest.to_pickle(tmp_path)
+        os.replace(tmp_path, path)
+        print(f"💾 Saved manifest {path}")
+
+    train_df = manifest[manifest['split'] == "train"].drop(columns="split")
+    val_df = manifest[manifest['split'] == "val"].drop(columns="split")
+    print(f"✅ Data split: {len(train_df)} training, {len(val_df)} validation")
+    return train_df, val_df
+
+
 # ======================= DATA GENERATORS =========================
 
 def create_generators(train_df: pd.DataFrame, val_df: pd.DataFrame):
     """Create training and validation generators with augmentation."""
-    train_datagen = ImageDataGenerator(
-        rescale=1. / 255,
-        rotation_range=30,
-        width_shift_range=0.2,
-        height_shift_range=0.2,
-        shear_range=0.2,
-        zoom_range=0.2,
-        horizontal_flip=True,
-        brightness_range=[0.8, 1.2]
-    )
+    train_datagen = ImageDataGenerator(rescale=1. / 255, **AUGMENTATION)
 
     val_datagen = ImageDataGenerator(rescale=1. / 255)
 
@@ -117,11 +214,161 @@ def create_generators(train_df: pd.DataFrame, val_df: pd.DataFrame):
     return train_gen, val_gen
 
 
+# ======================= TF.DATA PIPELINE ========================
+
+def load_image(path: tf.Tensor, label: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+    """Decode and resize one image file to uint8 at IMG_SIZE."""
+    image = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    image = tf.image.resize(image, CONFIG["IMG_SIZE"])
+    return tf.cast(tf.round(image), tf.uint8), label
+
+
+def augmentation_transforms(batch_size: tf.Tensor, height: int, width: int) -> tf.Tensor:
+    """Random affine transforms matching ImageDataGenerator, one row per image.
+
+    Rotation, shift, shear, zoom and flip are folded into a single
+    output-to-input matrix per image, so the batch is resampled once.
+    """
+    def uniform(limit, center=0.0):
+        return tf.random.uniform([batch_size], center - limit, center + limit)
+
+    theta = uniform(np.deg2rad(AUGMENTATION["rotation_range"]))
+    tx = uniform(AUGMENTATION["width_shift_range"]) * width
+    ty = uniform(AUGMENTATION["height_shift_range"]) * height
+    # ImageDataGenerator takes shear in degrees
+    shear = uniform(np.deg2rad(AUGMENTATION["shear_range"]))
+    zx = uniform(AUGMENTATION["zoom_range"], 1.0)
+    zy = uniform(AUGMENTATION["zoom_range"], 1.0)
+    flip = tf.where(tf.random.uniform([batch_size]) < 0.5, -1.0, 1.0) if AUGMENTATION["horizontal_flip"] else tf.ones([batch_size])
+
+    zeros, ones = tf.zeros([batch_size]), tf.ones([batch_size])
+
+    def matrix(rows):
+        return tf.stack([tf.stack(row, axis=-1) for row in rows], axis=-2)
+
+    cx, cy = (width - 1) / 2, (height - 1) / 2
+    to_center = matrix([[ones, zeros, zeros + cx], [zeros, ones, zeros + cy], [zeros, zeros, ones]])
+    rotate = matrix([[tf.cos(theta), -tf.sin(theta), zeros], [tf.sin(theta), tf.cos(theta), zeros], [zeros, zeros, ones]])
+    shift = matrix([[ones, zeros, tx], [zeros, ones, ty], [zeros, zeros, ones]])
+    shear_zoom_flip = matrix([
+        [zx * flip, -tf.sin(shear) * zy, zeros],
+        [zeros, tf.cos(shear) * zy, zeros],
+        [zeros, zeros, ones],
+    ])
+    from_center = matrix([[ones, zeros, zeros - cx], [zeros, ones, zeros - cy], [zeros, zeros, ones]])
+
+    transform = to_center @ rotate @ shift @ shear_zoom_flip @ from_center
+    return tf.concat([tf.reshape(transform[:, :2, :], [-1, 6]), tf.zeros([batch_size, 2])], axis=1)
+
+
+def augment_batch(images: tf.Tensor, labels: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+    """Apply the training augmentations to a whole uint8 batch and rescale to [0, 1]."""
+    batch_size = tf.shape(images)[0]
+    height, width = CONFIG["IMG_SIZE"]
+    images = tf.raw_ops.ImageProjectiveTransformV3(
+        images=tf.cast(images, tf.float32),
+        transforms=augmentation_transforms(batch_size, height, width),
+        output_shape=[height, width],
+        fill_value=0.0,
+        interpolation="BILINEAR",
+        fill_mode="NEAREST",
+    )
+
+    low, high = AUGMENTATION["brightness_range"]
+    brightness = tf.random.uniform([batch_size, 1, 1, 1], low, high)
+    images = tf.clip_by_value(images * brightness, 0.0, 255.0)
+    return images / 255.0, labels
+
+
+def rescale_batch(images: tf.Tensor, labels: tf.Tensor) -> Tuple[tf.Tensor, tf.Tensor]:
+    return tf.cast(images, tf.float32) / 255.0, labels
+
+
+def make_dataset(df: pd.DataFrame, training: bool) -> tf.data.Dataset:
+    """Parallel decode, optional cache, shuffle, batch, batched augmentation and prefetch."""
+    labels = df['label'].map(CLASS_NAMES.index).astype(np.float32).values
+    ds = tf.data.Dataset.from_tensor_slices((df['filepath'].values, labels))
+    ds = ds.map(load_image, num_parallel_calls=tf.data.AUTOTUNE, deterministic=not training)
+
+    if CONFIG["DATA_CACHE"] is not None:
+        ds = ds.cache(CONFIG["DATA_CACHE"])
+    if training:
+        # After the cache, so every epoch sees a new order
+        ds = ds.shuffle(CONFIG["SHUFFLE_BUFFER"], seed=CONFIG["RANDOM_STATE"], reshuffle_each_iteration=True)
+
+    ds = ds.batch(CONFIG["BATCH_SIZE"])
+    ds = ds.map(augment_batch if training else rescale_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def create_datasets(train_df: pd.DataFrame, val_df: pd.DataFrame):
+    """tf.data equivalents of create_generators()."""
+    return make_dataset(train_df, training=True), make_dataset(val_df, training=False)
+
+
+# ======================= DATASET SHARDS ==========================
+
+def ensure_shards(df: pd.DataFrame, split: str) -> ShardedDataset:
+    """Shards for `df` under SHARD_DIR/<split>, built on first use or when the split or its labels changed."""
+    directory = os.path.join(CONFIG["SHARD_DIR"], split)
+    index = read_index(directory)
+    filepaths = list(df['filepath'])
+    labels = df['label'].map(CLASS_NAMES.index).values.astype(np.float32)
+    if (index is None or index["filepaths"] != filepaths or index.get("labels") != labels.tolist()
+            or tuple(index["size"]) != CONFIG["IMG_SIZE"]):
+        print(f"🧱 Building {split} shards for {len(df)} images in {directory}...")
+        build_shards(filepaths, labels, directory, size=CONFIG["IMG_SIZE"])
+    return ShardedDataset(directory)
+
+
+def make_shard_dataset(shards: ShardedDataset, training: bool) -> tf.data.Dataset:
+    """Batches read from memory-mapped shards, then the same augmentation and prefetch as make_dataset()."""
+    width, height = shards.size
+    # Kept across epochs, so every epoch gets a new order
+    rng = np.random.default_rng(CONFIG["RANDOM_STATE"]) if training else None
+    ds = tf.data.Dataset.from_generator(
+        lambda: shards.batches(CONFIG["BATCH_SIZE"], rng=rng),
+        output_signature=(
+            tf.TensorSpec((None, height, width, 3), tf.uint8),
+            tf.TensorSpec((None,), tf.float32),
+        ),
+    )
+    ds = ds.map(augment_batch if training else rescale_batch, num_parallel_calls=tf.data.AUTOTUNE)
+    return ds.prefetch(tf.data.AUTOTUNE)
+
+
+def create_shard_datasets(train_df: pd.DataFrame, val_df: pd.DataFrame):
+    """make_dataset() equivalents that decode each image once, when the shards are built."""
+    return (
+        make_shard_dataset(ensure_shards(train_df, "train"), training=True),
+        make_shard_dataset(ensure_shards(val_df, "val"), training=False),
+    )
+
+
+def create_inputs(train_df: pd.DataFrame, val_df: pd.DataFrame):
+    """Training and validation inputs for the configured INPUT_PIPELINE."""
+    if CONFIG["INPUT_PIPELINE"] == "tf.data":
+        return create_datasets(train_df, val_df)
+    if CONFIG["INPUT_PIPELINE"] == "shards":
+        return create_shard_datasets(train_df, val_df)
+    if CONFIG["INPUT_PIPELINE"] == "generator":
+        return create_generators(train_df, val_df)
+    raise ValueError(f"❌ Unknown INPUT_PIPELINE: {CONFIG['INPUT_PIPELINE']}")
+
+
 # ============================ MODEL ==============================
 
+def training_mode() -> dict:
+    if CONFIG["TRAINING_MODE"] not in TRAINING_MODES:
+        raise ValueError(f"❌ Unknown TRAINING_MODE: {CONFIG['TRAINING_MODE']}")
+    return TRAINING_MODES[CONFIG["TRAINING_MODE"]]
+
+
 def build_model(freeze_all: bool = True) -> Model:
+    # The policy applies to layers created after it is set
+    tf.keras.mixed_precision.set_global_policy(training_mode()["policy"])
     base_model = ResNet50(
-        weights='imagenet',
+        weights=CONFIG["BACKBONE_WEIGHTS"],
         include_top=False,
         input_shape=(*CONFIG["IMG_SIZE"], 3)
     )
@@ -129,21 +376,31 @@ def build_model(freeze_all: bool = True) -> Model:
     for layer in base_model.layers:
         layer.trainable = not freeze_all
 
-    x = GlobalAveragePooling2D()(base_model.output)
-    x = Dropout(0.5)(x)
-    output = Dense(1, activation='sigmoid')(x)
+    x = GlobalAveragePooling2D(name='pooled_features')(base_model.output)
+    x = Dropout(0.5, name='head_dropout')(x)
+    output = Dense(1, activation='sigmoid', dtype='float32', name='head')(x)
 
     model = Model(inputs=base_model.input, outputs=output)
+    compile_model(model, learning_rate=0.01 if freeze_all else 1e-5)
+    return model
 
+
+def compile_model(model: Model, learning_rate: float):
+    mode = training_mode()
     model.compile(
-        optimizer=SGD(
-            learning_rate=0.01 if freeze_all else 1e-5,
-            momentum=0.9
-        ),
+        optimizer=SGD(learning_rate=learning_rate, momentum=0.9),
         loss='binary_crossentropy',
-        metrics=['accuracy']
+        metrics=['accuracy'],
+        jit_compile=mode["jit_compile"],
+        steps_per_execution=mode["steps_per_execution"]
     )
 
+
+def unfreeze_for_fine_tuning(model: Model) -> Model:
+    """Make the whole model trainable with the fine-tuning learning rate, keeping its trained head."""
+    for layer in model.layers:
+        layer.trainable = True
+    compile_model(model, learning_rate=1e-5)
     return model
 
 
@@ -163,6 +420,94 @@ def train_model(model: Model, train_gen, val_gen):
     return history
 
 
+# ====================== FEATURE CACHING ==========================
+
+def feature_inputs(df: pd.DataFrame, split: str) -> tf.data.Dataset:
+    """Unaugmented, unshuffled batches of `df` from the configured input pipeline."""
+    if CONFIG["INPUT_PIPELINE"] == "shards":
+        return make_shard_dataset(ensure_shards(df, split), training=False)
+    return make_dataset(df, training=False)
+
+
+def feature_signature() -> dict:
+    """Everything besides the file list that changes the cached features."""
+    return {
+        "backbone": ResNet50.__name__,
+        "weights": CONFIG["BACKBONE_WEIGHTS"],
+        "img_size": list(CONFIG["IMG_SIZE"]),
+        "policy": training_mode()["policy"],
+        "input_pipeline": CONFIG["INPUT_PIPELINE"],
+    }
+
+
+def cached_features(model: Model, df: pd.DataFrame, split: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Pooled backbone features and labels for `df`, computed once per split, file list and backbone.
+
+    Labels come from `df` on every call rather than from the cache, since
+    relabeling images doesn't change their features.
+    """
+    directory = os.path.join(CONFIG["FEATURE_CACHE"], split)
+    index_path = os.path.join(directory, "index.json")
+    filepaths = list(df['filepath'])
+    signature = feature_signature()
+
+    try:
+        with open(index_path) as f:
+            index = json.load(f)
+    except FileNotFoundError:
+        index = None
+
+    if index is None or index["filepaths"] != filepaths or index.get("signature") != signature:
+        print(f"🧠 Extracting {split} backbone features for {len(df)} images...")
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(index_path):
+            os.remove(index_path)
+
+        backbone = Model(inputs=model.input, outputs=model.get_layer('pooled_features').output)
+        features = np.lib.format.open_memmap(
+            os.path.join(directory, "features.npy"), mode="w+", dtype=np.float32,
+            shape=(len(df), backbone.output.shape[-1])
+        )
+        start = 0
+        for images, _ in feature_inputs(df, split):
+            end = start + len(images)
+            features[start:end] = backbone(images, training=False).numpy()
+            start = end
+        features.flush()
+        del features
+
+        # Written last, so it only exists for complete extractions
+        with open(index_path + ".tmp", "w") as f:
+            json.dump({"filepaths": filepaths, "signature": signature}, f)
+        os.replace(index_path + ".tmp", index_path)
+
+    labels = df['label'].map(CLASS_NAMES.index).values.astype(np.float32)
+    return np.load(os.path.join(directory, "features.npy")), labels
+
+
+def features_dataset(features: np.ndarray, labels: np.ndarray, training: bool) -> tf.data.Dataset:
+    ds = tf.data.Dataset.from_tensor_slices((features, labels))
+    if training:
+        ds = ds.shuffle(len(features), seed=CONFIG["RANDOM_STATE"], reshuffle_each_iteration=True)
+    return ds.batch(CONFIG["BATCH_SIZE"]).prefetch(tf.data.AUTOTUNE)
+
+
+def train_head_on_features(model: Model, train_df: pd.DataFrame, val_df: pd.DataFrame):
+    """First training stage on cached features; trains `model`'s own head layers in place."""
+    train_x, train_y = cached_features(model, train_df, "train")
+    val_x, val_y = cached_features(model, val_df, "val")
+
+    # Shares the dropout and dense layers with `model`, so no weights need copying back
+    inputs = Input(shape=train_x.shape[1:])
+    head = Model(inputs=inputs, outputs=model.get_layer('head')(model.get_layer('head_dropout')(inputs)))
+    compile_model(head, learning_rate=0.01)
+    return train_model(
+        head,
+        features_dataset(train_x, train_y, training=True),
+        features_dataset(val_x, val_y, training=False)
+    )
+
+
 # ======================== INFERENCE ==============================
 
 def predict_single_image(model: Model, path: str) -> str:
@@ -181,6 +526,8 @@ def predict_single_image(model: Model, path: str) -> str:
 # ========================= PIPELINE ==============================
 
 def main():
+    from google.colab import drive
+
     print("🔗 Mounting Google Drive...")
     drive.mount('/content/drive')
     print("✅ Google Drive mounted.\n")
@@ -188,21 +535,21 @@ def main():
     print("🔍 Verifying dataset paths...")
     verify_paths()
 
-    print("\n📊 Loading and preparing data...")
-    df = load_and_merge_data()
-
-    print("\n📂 Splitting dataset...")
-    train_df, val_df = split_data(df)
+    print("\n📊 Loading, preparing and splitting data...")
+    train_df, val_df = load_splits()
 
-    print("\n🧪 Preparing image generators...")
-    train_gen, val_gen = create_generators(train_df, val_df)
+    print(f"\n🧪 Preparing {CONFIG['INPUT_PIPELINE']} input pipeline...")
+    train_gen, val_gen = create_inputs(train_df, val_df)
 
     print("\n🔧 Building and training base model...")
     model = build_model(freeze_all=True)
-    train_model(model, train_gen, val_gen)
+    if CONFIG["FEATURE_CACHE"]:
+        train_head_on_features(model, train_df, val_df)
+    else:
+        train_model(model, train_gen, val_gen)
 
     print("\n🔁 Fine-tuning model...")
-    model = build_model(freeze_all=False)
+    model = unfreeze_for_fine_tuning(model)
     train_model(model, train_gen, val_gen)
 
     print("\n💾 Saving model...")
@@ -0,0 +1,51 @@
+import os
+
+import cv2
+import numpy as np
+from scipy import ndimage as ndi
+from skimage import morphology
+
+from rendering import render_overlay
+from segmentation import cluster_channel
+
+# Model-independent steps of the blood smear pipeline, shared by the web app
+# (aaa.py) and the background job workers (jobs.py).
+
+# Class labels
+class_names = ['EarlyPreB', 'PreB', 'ProB', 'Benign']
+
+# Generate overlay image from a Grad-CAM++ intensity map (see gradcam.grad_cam_plus_intensity)
+def generate_overlay(prepared, intensity, alpha=0.4):
+    # Returned as BGR; encoding happens once per requested response format
+    return render_overlay(prepared.bgr(), intensity, alpha)
+
+# SEGMENT_MODE=fast clusters the a-channel histogram, "exact" refits sklearn KMeans
+segment_mode = os.environ.get("SEGMENT_MODE", "fast")
+
+# Lesion mask (uint8 0/1) of a LAB a-channel: KMeans + Morphology
+def segmentation_mask(a, mode=None):
+    clustered_img = cluster_channel(a, n_clusters=7, mode=mode or segment_mode)
+
+    _, binary_mask = cv2.threshold(clustered_img, 141, 255, cv2.THRESH_BINARY)
+    filled = ndi.binary_fill_holes(binary_mask)
+    cleaned1 = morphology.remove_small_objects(filled, 200)
+    cleaned2 = morphology.remove_small_holes(cleaned1, 250)
+    return cleaned2.astype(np.uint8)
+
+# Segment image using KMeans + Morphology
+def segment_image(prepared):
+    img = prepared.bgr()
+    final_mask = segmentation_mask(prepared.lab()[:, :, 1])
+
+    # Returned as BGR; encoding happens once per requested response format
+    return cv2.bitwise_and(img, img, mask=final_mask)
+
+def classify(predictions):
+    """Classification fields of a /predict response for one output row."""
+    predicted_class_index = int(np.argmax(predictions))
+    return {
+        "predictions": predictions.tolist(),
+        "predicted_class": predicted_class_index,
+        "predicted_class_name": class_names[predicted_class_index],
+        "confidence": float(np.max(predictions)),
+    }
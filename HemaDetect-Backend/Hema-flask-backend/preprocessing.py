@@ -0,0 +1,130 @@
+import io
+import os
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# REDUCED_DECODE=0 always decodes JPEG uploads at full resolution
+REDUCED_DECODE = os.environ.get("REDUCED_DECODE", "1") == "1"
+
+# JPEG DCT scaling factors and the matching OpenCV decode flags
+_CV2_REDUCED_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def reduction_factor(image_size, min_size):
+    """Largest JPEG scale (1, 2, 4 or 8) whose result still covers `min_size`.
+
+    Compares the short side against the longest requested side, so the
+    choice holds whichever way EXIF orientation turns the image.
+    """
+    for factor in (8, 4, 2):
+        if min(image_size) // factor >= max(min_size):
+            return factor
+    return 1
+
+
+def open_image(data, min_size=None):
+    """Decode an upload with PIL, letting JPEGs decode at a reduced scale.
+
+    With `min_size` (w, h), JPEG draft mode downscales in the DCT domain to
+    the smallest size that still covers it, instead of decoding every pixel
+    of a large camera image only to resize it away.
+    """
+    image = Image.open(io.BytesIO(data))
+    if REDUCED_DECODE and min_size and image.format == "JPEG":
+        image.draft(image.mode, min_size)
+    image.load()
+    return image
+
+
+def decode_bgr(data, min_size=None):
+    """`cv2.imdecode` as BGR, using IMREAD_REDUCED_* for JPEGs larger than `min_size`.
+
+    Returns None if the data can't be decoded, like `cv2.imdecode`.
+    """
+    flags = cv2.IMREAD_COLOR
+    if REDUCED_DECODE and min_size:
+        try:
+            # Only parses the header; pixels are decoded by OpenCV below
+            header = Image.open(io.BytesIO(data))
+            if header.format == "JPEG":
+                flags = _CV2_REDUCED_FLAGS[reduction_factor(header.size, min_size)]
+        except Exception:
+            pass
+    return cv2.imdecode(np.frombuffer(data, np.uint8), flags)
+
+
+class PreparedImage:
+    """A decoded upload and the resized views derived from it.
+
+    Each view (RGB, BGR, LAB, gray or normalized model input at a given
+    size) is computed on first use and cached, so the classifier, Grad-CAM
+    overlay and segmentation all read the same buffers instead of resizing
+    the upload again. Views are shared: treat them as read-only.
+
+    `source` is either a PIL image, resized with PIL like the blood smear
+    pipeline always has, or a BGR uint8 array from `cv2.imdecode`, resized
+    with OpenCV.
+    """
+
+    def __init__(self, source):
+        self.source = source
+        self.is_pil = isinstance(source, Image.Image)
+        self._views = {}
+        # Re-entrant because views are built from other views
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_bytes(cls, data, min_size=None):
+        """Decode an upload with PIL; raises if it isn't a readable image.
+
+        Pass the largest view size needed as `min_size` to allow a reduced
+        JPEG decode (see `open_image`).
+        """
+        return cls(open_image(data, min_size))
+
+    def _view(self, key, build):
+        with self._lock:
+            view = self._views.get(key)
+            if view is None:
+                view = self._views[key] = build()
+            return view
+
+    def rgb(self, size=(224, 224)):
+        """uint8 RGB array of shape (h, w, 3) for `size` given as (w, h)."""
+        if self.is_pil:
+            return self._view(("rgb", size), lambda: np.asarray(self.source.convert("RGB").resize(size)))
+        return self._view(("rgb", size), lambda: cv2.cvtColor(self.bgr(size), cv2.COLOR_BGR2RGB))
+
+    def bgr(self, size=(224, 224)):
+        if self.is_pil:
+            return self._view(("bgr", size), lambda: cv2.cvtColor(self.rgb(size), cv2.COLOR_RGB2BGR))
+        return self._view(("bgr", size), lambda: cv2.resize(self.source, size))
+
+    def lab(self, size=(224, 224)):
+        return self._view(("lab", size), lambda: cv2.cvtColor(self.bgr(size), cv2.COLOR_BGR2LAB))
+
+    def gray(self, size=(224, 224)):
+        return self._view(("gray", size), lambda: cv2.cvtColor(self.bgr(size), cv2.COLOR_BGR2GRAY))
+
+    def normalized(self, size=(224, 224)):
+        """float32 RGB in [0, 1] with a leading batch axis, ready for the classifier."""
+        return self._view(("normalized", size), lambda: np.expand_dims(self.rgb(size).astype(np.float32) / 255.0, axis=0))
+
+    def compact_source(self, size=(224, 224)):
+        """The uint8 view at `size`, in the same kind as `source`.
+
+        `PreparedImage(image.compact_source(size))` rebuilds every view at
+        `size` exactly, so it can stand in for the full decode when only
+        those views are needed later.
+        """
+        if self.is_pil:
+            return Image.fromarray(self.rgb(size))
+        return self.bgr(size)
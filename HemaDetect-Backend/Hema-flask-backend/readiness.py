@@ -0,0 +1,78 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    """Warm-up progress of one worker, reported by its readiness endpoint.
+
+    `run()` pushes synthetic inputs through each named step and records how
+    long each took. The worker only reports ready once every step has run,
+    so a load balancer polling the endpoint never routes traffic to a cold
+    worker. If a required step (by default, any step) fails, the worker
+    stays "failed" and never reports ready, so a worker whose model didn't
+    load gets no traffic. Other failing steps are logged and reported only.
+    """
+
+    def __init__(self):
+        self.state = "pending"
+        self.timings = {}
+        self.errors = {}
+        self.total_ms = None
+        self.required = None
+
+    @property
+    def ready(self):
+        return self.state in ("ready", "skipped")
+
+    def run(self, steps, background=False, required=None):
+        """Run `steps` (name -> callable), in a daemon thread if `background`.
+
+        `required` names the steps that must succeed; None means all of them.
+        """
+        self.required = set(steps) if required is None else set(required)
+        self.state = "warming_up"
+        if background:
+            thread = threading.Thread(target=self._run, args=(steps,), name="warm-up", daemon=True)
+            thread.start()
+            return thread
+        self._run(steps)
+
+    def _run(self, steps):
+        started = time.perf_counter()
+        for name, step in steps.items():
+            step_started = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                logger.error(f"Warm-up step {name} failed: {str(e)}")
+                self.errors[name] = str(e)
+            self.timings[name] = round((time.perf_counter() - step_started) * 1000, 1)
+        self.total_ms = round((time.perf_counter() - started) * 1000, 1)
+        failed = sorted(self.required & set(self.errors))
+        if failed:
+            logger.error(f"Warm-up failed in required steps {failed}; not ready")
+            self.state = "failed"
+            return
+        logger.info(f"Warm-up finished in {self.total_ms} ms: {self.timings}")
+        self.state = "ready"
+
+    def skip(self):
+        self.state = "skipped"
+
+    def status(self):
+        status = {"status": self.state, "warm_up_ms": dict(self.timings), "total_ms": self.total_ms}
+        if self.errors:
+            status["errors"] = dict(self.errors)
+        return status
+
+
+def start_warm_up(readiness, steps, mode, required=None):
+    """Apply a WARM_UP_MODELS setting: "1" blocks until warm, "background" warms
+    in a thread while the worker starts serving, "0" skips warm-up."""
+    if mode == "0":
+        readiness.skip()
+    else:
+        readiness.run(steps, background=(mode == "background"), required=required)
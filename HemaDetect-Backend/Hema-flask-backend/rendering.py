@@ -0,0 +1,41 @@
+import threading
+
+import cv2
+import numpy as np
+
+# JET colormap as a (256, 3) BGR lookup table, built once
+JET_LUT = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), cv2.COLORMAP_JET).reshape(256, 3)
+
+# The overlay used to re-apply JET to a heatmap that was already JET-colored,
+# which OpenCV does by converting it to gray first. Composing jet(gray(jet(v)))
+# into one table gives the same colors straight from the CAM intensity.
+_JET_GRAY = cv2.cvtColor(JET_LUT.reshape(256, 1, 3), cv2.COLOR_BGR2GRAY).reshape(256)
+OVERLAY_LUT = JET_LUT[_JET_GRAY]
+
+# Per-thread scratch buffer for the colored heatmap
+_scratch = threading.local()
+
+
+def _heat_buffer(shape):
+    heat = getattr(_scratch, "heat", None)
+    if heat is None or heat.shape != shape:
+        heat = _scratch.heat = np.empty(shape, dtype=np.uint8)
+    return heat
+
+
+def render_overlay(image, intensity, alpha=0.4):
+    """Blend a Grad-CAM intensity map over a BGR image.
+
+    `intensity` is the uint8 (H, W) map from `grad_cam_plus_intensity()`,
+    or None when no map could be computed. The colors come from one cached
+    LUT lookup into a reused scratch buffer. The blended result is a new
+    array, because the result store keeps it as the raw artifact.
+    """
+    heat = _heat_buffer(image.shape)
+    if intensity is None:
+        # Same result as overlaying the blank heatmap grad_cam_plus() returns on failure
+        heat[:] = JET_LUT[0]
+    else:
+        np.take(OVERLAY_LUT, intensity, axis=0, out=heat)
+
+    return cv2.addWeighted(image, 1 - alpha, heat, alpha, 0)
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class MemoryBackend:
+    """In-process LRU of bytes values, bounded by total value size."""
+
+    name = "memory"
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._items = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self._size -= len(old)
+            self._items[key] = value
+            self._size += len(value)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._items), "bytes": self._size}
+
+
+class DiskBackend:
+    """On-disk LRU shared by every worker process pointing at the same directory.
+
+    Writes go through a temp file and `os.replace`, so readers in other
+    processes never see partial values. Reads bump the file mtime, and
+    eviction removes the least recently used files once the directory grows
+    past `max_bytes`.
+    """
+
+    name = "disk"
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._size = self._scan()[1]
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest())
+
+    def _scan(self):
+        entries, total = [], 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.is_file() and not entry.name.startswith("."):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+        return entries, total
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = f.read()
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            return None
+
+    def set(self, key, value):
+        if len(value) > self.max_bytes:
+            return
+        path = self._path(key)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(value)
+        # An overwrite only grows the directory by the difference
+        try:
+            replaced = os.path.getsize(path)
+        except FileNotFoundError:
+            replaced = 0
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._size += len(value) - replaced
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        # Other workers write here too, so rescan instead of trusting our count
+        entries, total = self._scan()
+        entries.sort()
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+        self._size = total
+
+    def stats(self):
+        entries, total = self._scan()
+        return {"entries": len(entries), "bytes": total}
+
+
+class ResultCache:
+    """Content-addressed cache of prediction results and artifacts.
+
+    Keys combine a hash of the uploaded bytes with the model version and the
+    request parameters, so a re-submitted image skips inference entirely.
+    """
+
+    def __init__(self, backend, model_version):
+        self.backend = backend
+        self.model_version = model_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def digest(self, data):
+        """Identify an upload under the current model version."""
+        return hashlib.sha256(self.model_version.encode("utf-8") + data).hexdigest()
+
+    @staticmethod
+    def key(digest, **params):
+        return f"{digest}:{json.dumps(params, sort_keys=True)}"
+
+    def get(self, key):
+        value = self.backend.get(key) if self.backend else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, key, value):
+        if self.backend:
+            self.backend.set(key, value)
+
+    def stats(self):
+        with self._lock:
+            stats = {"hits": self.hits, "misses": self.misses}
+        if self.backend:
+            stats.update(backend=self.backend.name, max_bytes=self.backend.max_bytes, **self.backend.stats())
+        else:
+            stats.update(backend="none")
+        return stats
+
+
+def file_version(*paths):
+    """Hash of the given model files, used to invalidate results when a model changes."""
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def create_result_cache(model_version):
+    """Build the cache configured by RESULT_CACHE_BACKEND (memory, disk or none)."""
+    backend_name = os.environ.get("RESULT_CACHE_BACKEND", "memory")
+    max_bytes = int(os.environ.get("RESULT_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+    if backend_name == "memory":
+        backend = MemoryBackend(max_bytes)
+    elif backend_name == "disk":
+        directory = os.environ.get("RESULT_CACHE_DIR", os.path.join(tempfile.gettempdir(), "hemadetect-results"))
+        backend = DiskBackend(directory, max_bytes)
+    elif backend_name == "none":
+        backend = None
+    else:
+        raise ValueError(f"Unknown RESULT_CACHE_BACKEND: {backend_name}")
+    return ResultCache(backend, model_version)
@@ -0,0 +1,58 @@
+import threading
+import uuid
+from collections import OrderedDict
+
+
+class ResultStore:
+    """Bounded in-process store of prediction inputs and their lazy artifacts.
+
+    `/predict` registers the inputs an artifact needs and hands back a
+    result ID. Artifacts are only computed the first time someone asks for
+    them and are kept alongside the inputs until the entry is evicted.
+    """
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max(1, int(max_entries))
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, inputs, result_id=None):
+        """Register inputs under `result_id` (random if omitted) and return the ID.
+
+        Re-registering an ID that is still stored keeps its computed artifacts.
+        """
+        result_id = result_id or uuid.uuid4().hex
+        with self._lock:
+            if result_id in self._entries:
+                self._entries.move_to_end(result_id)
+                return result_id
+            self._entries[result_id] = {"inputs": inputs, "artifacts": {}, "lock": threading.RLock()}
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result_id
+
+    def _get(self, result_id):
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is not None:
+                self._entries.move_to_end(result_id)
+            return entry
+
+    def __contains__(self, result_id):
+        return self._get(result_id) is not None
+
+    def get_artifact(self, result_id, name, compute):
+        """Return artifact `name`, calling `compute(**inputs)` on first use.
+
+        Returns None if the result ID is unknown or has been evicted.
+        """
+        entry = self._get(result_id)
+        if entry is None:
+            return None
+
+        # Per-entry lock so concurrent fetches of one result compute it once;
+        # re-entrant because an encoded artifact is built from the raw one
+        with entry["lock"]:
+            if name not in entry["artifacts"]:
+                entry["artifacts"][name] = compute(**entry["inputs"])
+            return entry["artifacts"][name]
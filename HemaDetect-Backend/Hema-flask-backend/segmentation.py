@@ -0,0 +1,80 @@
+import numpy as np
+
+# Minimum fraction of pixels of the final segmentation mask (after hole
+# filling and small-object removal) the fast mode must agree on with the
+# exact mode. The exact mode's KMeans stops at local optima, so the two can
+# differ near the mask threshold, and hole filling can grow a difference.
+# Over 300 synthetic images (test_segmentation.py's generator, seeds 0-29
+# with 10 images each) the worst case was 0.915; the test checks seeds 0-7
+# with 5 images each.
+MASK_AGREEMENT_TOLERANCE = 0.90
+
+
+def kmeans_histogram(hist, n_clusters):
+    """Optimal 1-D k-means over a histogram of integer values.
+
+    Runs the Ckmeans dynamic program over the occupied bins only, so the
+    cost depends on the number of distinct values (at most 256 for a uint8
+    channel) rather than the number of pixels. Returns the sorted centers.
+    """
+    values = np.flatnonzero(hist)
+    weights = hist[values].astype(np.float64)
+    values = values.astype(np.float64)
+    n = len(values)
+    k = min(n_clusters, n)
+
+    # Prefix sums give the weighted SSE of any run of bins in O(1)
+    cw = np.concatenate([[0.0], np.cumsum(weights)])
+    cx = np.concatenate([[0.0], np.cumsum(weights * values)])
+    cxx = np.concatenate([[0.0], np.cumsum(weights * values ** 2)])
+
+    # cost[i, j] = SSE of bins i..j clustered together (inf when i > j)
+    i = np.arange(n)[:, None]
+    j = np.arange(n)[None, :]
+    valid = i <= j
+    w = np.where(valid, cw[j + 1] - cw[i], 1.0)
+    sx = cx[j + 1] - cx[i]
+    cost = np.where(valid, (cxx[j + 1] - cxx[i]) - sx ** 2 / w, np.inf)
+
+    # best[j] = lowest SSE for bins 0..j split into the clusters placed so far
+    best = cost[0]
+    starts = []
+    for _ in range(1, k):
+        total = best[:-1, None] + cost[1:, :]
+        arg = np.argmin(total, axis=0)
+        starts.append(arg + 1)
+        best = total[arg, np.arange(n)]
+
+    # Walk the split points back from the last bin
+    bounds = [n]
+    for start in reversed(starts):
+        bounds.append(start[bounds[-1] - 1])
+    bounds.append(0)
+    bounds = bounds[::-1]
+
+    return np.array([
+        (cx[hi] - cx[lo]) / (cw[hi] - cw[lo]) for lo, hi in zip(bounds[:-1], bounds[1:])
+    ])
+
+
+def cluster_channel(channel, n_clusters=7, mode="fast"):
+    """Replace every pixel of a uint8 channel with its k-means cluster center.
+
+    "fast" clusters the 256-bin histogram; "exact" is the original sklearn
+    KMeans fit over every pixel.
+    """
+    if mode == "exact":
+        from sklearn.cluster import KMeans
+
+        km = KMeans(n_clusters=n_clusters, random_state=0, n_init=10).fit(channel.reshape((-1, 1)))
+        clustered = km.cluster_centers_[km.labels_]
+        return clustered.reshape(channel.shape).astype(np.uint8)
+    if mode != "fast":
+        raise ValueError(f"Unknown segmentation mode: {mode}")
+
+    hist = np.bincount(channel.ravel(), minlength=256)
+    centers = kmeans_histogram(hist, n_clusters)
+
+    # Nearest-center lookup table for every possible channel value
+    lut = centers[np.abs(np.arange(256)[:, None] - centers[None, :]).argmin(axis=1)]
+    return lut.astype(np.uint8)[channel]
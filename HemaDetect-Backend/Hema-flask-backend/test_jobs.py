@@ -0,0 +1,63 @@
+import io
+import os
+import signal
+import time
+
+import numpy as np
+import tensorflow as tf
+from PIL import Image
+
+from jobs import DONE, FAILED, QUEUED, JobQueue
+
+
+def make_models(directory):
+    # Tiny 4-class stand-in for Model/model4, saved in both formats the workers load
+    inputs = tf.keras.Input((224, 224, 3))
+    x = tf.keras.layers.Conv2D(4, 3, strides=8, name="out_relu")(inputs)
+    x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    outputs = tf.keras.layers.Dense(4, activation="softmax")(x)
+    model = tf.keras.Model(inputs, outputs)
+
+    h5_path = os.path.join(directory, "model.h5")
+    tflite_path = os.path.join(directory, "model.tflite")
+    model.save(h5_path)
+    with open(tflite_path, "wb") as f:
+        f.write(tf.lite.TFLiteConverter.from_keras_model(model).convert())
+    return tflite_path, h5_path
+
+
+def jpeg_bytes():
+    buffer = io.BytesIO()
+    Image.fromarray(np.random.default_rng(0).integers(0, 256, (256, 256, 3), dtype=np.uint8)).save(buffer, "JPEG")
+    return buffer.getvalue()
+
+
+def wait_for(queue, job_id, timeout=120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in (DONE, FAILED):
+            return job
+        time.sleep(0.2)
+    raise AssertionError(f"Job {job_id} did not finish: {queue.get(job_id)}")
+
+
+def test_submit_recovers_after_worker_killed(tmp_path):
+    tflite_path, h5_path = make_models(str(tmp_path))
+    queue = JobQueue(str(tmp_path / "jobs.sqlite3"), tflite_path, h5_path, workers=1, max_pending=2)
+    data = jpeg_bytes()
+
+    assert wait_for(queue, queue.submit(data, ()))["status"] == DONE
+
+    for process in list(queue._executor._processes.values()):
+        os.kill(process.pid, signal.SIGKILL)
+
+    # Whether the dead worker is noticed before or after this submit, the job runs on a new pool
+    job = wait_for(queue, queue.submit(data, ()))
+    assert job["status"] == DONE, job
+    assert len(job["result"]["predictions"]) == 4
+
+    # No QUEUED rows are left holding max_pending slots
+    assert queue.stats().get(QUEUED, 0) == 0
+    for _ in range(3):
+        assert wait_for(queue, queue.submit(data, ()))["status"] == DONE
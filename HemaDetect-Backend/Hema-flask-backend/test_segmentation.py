@@ -0,0 +1,29 @@
+import cv2
+import numpy as np
+import pytest
+
+from pipeline import segmentation_mask
+from segmentation import MASK_AGREEMENT_TOLERANCE, cluster_channel
+
+
+def synthetic_a_channel(rng):
+    # Smooth color noise, like bench_segmentation.py's synthetic images
+    img = rng.integers(0, 255, (28, 28, 3), dtype=np.uint8)
+    img = cv2.GaussianBlur(cv2.resize(img, (224, 224), interpolation=cv2.INTER_CUBIC), (7, 7), 0)
+    return cv2.cvtColor(img, cv2.COLOR_RGB2LAB)[:, :, 1]
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_fast_mask_agrees_with_exact(seed):
+    rng = np.random.default_rng(seed)
+    for _ in range(5):
+        a = synthetic_a_channel(rng)
+        # The mask segment_image() applies, after thresholding and morphology
+        agreement = float((segmentation_mask(a, mode="fast") == segmentation_mask(a, mode="exact")).mean())
+        assert agreement >= MASK_AGREEMENT_TOLERANCE, f"seed {seed}: {agreement:.4f}"
+
+
+def test_fast_centers_are_optimal_for_few_values():
+    # With no more distinct values than clusters, every value is its own center
+    channel = np.array([[10, 10, 200], [90, 90, 200]], dtype=np.uint8)
+    assert np.array_equal(cluster_channel(channel, n_clusters=7, mode="fast"), channel)
@@ -5,7 +5,10 @@ import tensorflow as tf
 import cv2
 from PIL import Image
 import io
+import os
 import base64
+import threading
+import time
 from sklearn.cluster import KMeans
 from scipy import ndimage as ndi
 from skimage import morphology
@@ -41,7 +44,8 @@ def predict_tflite(img_array):
     return output_data[0]
 
 # ✅ Grad-CAM++ (your custom function)
-def grad_cam_plus(model, img_array, last_conv_layer_name="out_relu"):
+# Falls back to a blank heatmap on errors, unless `strict` (used by warm-up)
+def grad_cam_plus(model, img_array, last_conv_layer_name="out_relu", strict=False):
     try:
         # Create gradient model
         grad_model = tf.keras.models.Model(
@@ -75,6 +79,8 @@ def grad_cam_plus(model, img_array, last_conv_layer_name="out_relu"):
 
         # Handle None gradients
         if first_grad is None or second_grad is None:
+            if strict:
+                raise ValueError("Grad-CAM++ gradients are None")
             # Return a default heatmap if gradients are None
             return np.zeros((224, 224, 3), dtype=np.uint8)
 
@@ -99,6 +105,8 @@ def grad_cam_plus(model, img_array, last_conv_layer_name="out_relu"):
         return cam
     
     except Exception as e:
+        if strict:
+            raise
         print(f"Error in grad_cam_plus: {e}")
         # Return a default heatmap on error
         return np.zeros((224, 224, 3), dtype=np.uint8)
@@ -188,7 +196,46 @@ def predict():
     except Exception as e:
         return jsonify({"error": f"Processing failed: {str(e)}"}), 500
 
-# Add a health check endpoint
+# Warm-up: push a synthetic image through the classifier, Grad-CAM++ and
+# segmentation once, so the first real request doesn't pay for lazy
+# initialization. /ready reports 503 until it has finished, and for good if
+# a model step failed, so a load balancer only routes to warm workers.
+# WARM_UP_MODELS=1 warms before serving, "background" while serving, 0 skips.
+warm_up_state = {"status": "pending", "warm_up_ms": {}, "errors": {}}
+
+def warm_up():
+    image = Image.fromarray(np.random.default_rng(0).integers(0, 256, (224, 224, 3), dtype=np.uint8))
+    img_array = preprocess_image(image)
+    steps = {
+        "classifier": lambda: predict_tflite(img_array),
+        "gradcam": lambda: generate_overlay(image, grad_cam_plus(gradcam_model, img_array, strict=True)),
+        "segmentation": lambda: segment_image(image),
+    }
+    warm_up_state["status"] = "warming_up"
+    for name, step in steps.items():
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            print(f"Warm-up step {name} failed: {e}")
+            warm_up_state["errors"][name] = str(e)
+        warm_up_state["warm_up_ms"][name] = round((time.perf_counter() - started) * 1000, 1)
+    warm_up_state["status"] = "failed" if warm_up_state["errors"] else "ready"
+
+WARM_UP_MODELS = os.environ.get("WARM_UP_MODELS", "1")
+if WARM_UP_MODELS == "0":
+    warm_up_state["status"] = "skipped"
+elif WARM_UP_MODELS == "background":
+    threading.Thread(target=warm_up, name="warm-up", daemon=True).start()
+else:
+    warm_up()
+
+# Readiness for load balancers
+@app.route("/ready", methods=["GET"])
+def ready():
+    return jsonify(warm_up_state), 200 if warm_up_state["status"] in ("ready", "skipped") else 503
+
+# Add a health check endpoint (liveness only; see /ready for warm-up)
 @app.route("/health", methods=["GET"])
 def health_check():
     return jsonify({"status": "healthy", "message": "Backend is running"})